@@ -0,0 +1,59 @@
+"""Compara os decodificadores 'separators' e 'split' em avaliações até atingir um alvo.
+
+Uso:
+    python benchmark_decoders.py [instancias...] --runs 5 --target-gap 0.0 --seed 1 [--evrp-constraints]
+
+Para cada instância e decodificador, executa `runs` repetições com as mesmas sementes e
+informa em quantas o alvo (ótimo conhecido + `target-gap`%) foi atingido e a mediana do
+número de avaliações necessárias. Com --evrp-constraints, as duas codificações são avaliadas com
+as restrições de carga e bateria (ConfigEVRP.evrp_constraints).
+"""
+import argparse
+from typing import Dict, Optional
+
+import numpy as np
+
+from evrp_solver import AlgoritmoGeneticoEVRP, ConfigEVRP
+
+
+def evaluations_to_target(result: Dict, target: float) -> Optional[int]:
+    for fitness, evaluations in zip(result['history'], result['evaluations']):
+        if fitness <= target:
+            return evaluations
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('instances', nargs='*', default=["E-n23-k3.evrp", "E-n51-k5.evrp"])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-gap', type=float, default=0.0, help="Gap percentual alvo em relação a OPTIMAL_VALUE")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--evrp-constraints', action='store_true', help="Avalia carga e bateria (ConfigEVRP.evrp_constraints)")
+    args = parser.parse_args()
+
+    rows = []
+    for instance_file in args.instances:
+        for decoder in ('separators', 'split'):
+            solver = AlgoritmoGeneticoEVRP(instance_file, ConfigEVRP(runs=args.runs, seed=args.seed, decoder=decoder,
+                                                                   evrp_constraints=args.evrp_constraints))
+            solver.show_progress = False
+            target = solver.instance.optimal_value * (1 + args.target_gap / 100)
+            max_evaluations = solver._max_evaluations()
+            hits, fitnesses = [], []
+            for run_num, seed in solver._run_seeds().items():
+                result = solver._execute_run(run_num, max_evaluations, seed)
+                fitnesses.append(result['fitness'])
+                evaluations = evaluations_to_target(result, target)
+                if evaluations is not None:
+                    hits.append(evaluations)
+            rows.append((solver.instance.name, decoder, len(hits), np.median(hits) if hits else float('nan'), np.mean(fitnesses)))
+
+    print("\n" + "=" * 25 + f" Avaliações até o alvo (gap {args.target_gap:+.2f}%) " + "=" * 25)
+    print(f"{'Instância':<16}{'Decodificador':<14}{'Atingiu':>10}{'Mediana aval.':>16}{'Fitness médio':>16}")
+    for name, decoder, num_hits, median, mean_fitness in rows:
+        print(f"{name:<16}{decoder:<14}{f'{num_hits}/{args.runs}':>10}{median:>16,.0f}{mean_fitness:>16.4f}")
+
+
+if __name__ == "__main__":
+    main()
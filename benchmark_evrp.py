@@ -0,0 +1,216 @@
+"""Benchmark reprodutível dos caminhos críticos do solver.
+
+Uso:
+    python benchmark_evrp.py [instancias...] --synthetic 100 200 --output bench.json
+    python benchmark_evrp.py --baseline bench_base.json --tolerance 0.15
+
+Para cada instância (as duas incluídas no repositório e instâncias sintéticas de tamanho
+crescente) mede isoladamente a construção/avaliação de CromossomoEVRP, crossover, mutate,
+repair, _select_parent e uma geração completa no modo escolhido em --mode, além de avaliações
+por segundo e tempo até o gap alvo numa execução curta. O resultado é gravado em JSON; com --baseline, cada métrica é
+comparada à gravada anteriormente e o script termina com código 1 se alguma piorar mais que
+a tolerância.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from evrp_solver import AlgoritmoGeneticoEVRP, AvaliadorLoteEVRP, ConfigEVRP, CromossomoEVRP, OperadoresLoteEVRP
+
+BENCHMARK_VERSION = 2
+# Parâmetros que precisam coincidir para que duas execuções sejam comparáveis
+COMPARABLE_META = ('mode', 'budget', 'target_gap', 'seed', 'number', 'repeat')
+
+
+def write_synthetic_instance(directory: str, customers: int, seed: int) -> str:
+    """Gera uma instância EVRP aleatória com `customers` clientes.
+
+    Como o ótimo é desconhecido, OPTIMAL_VALUE recebe o custo de um tour do vizinho mais
+    próximo, usado apenas como referência para o gap alvo.
+    """
+    rng = np.random.default_rng(seed)
+    num_stations = max(2, customers // 10)
+    coords = rng.uniform(0, 1000, size=(1 + customers + num_stations, 2))
+    demands = rng.integers(1, 30, size=customers)
+    capacity = 200
+    vehicles = int(np.ceil(demands.sum() / capacity)) + 1
+
+    unvisited, current, reference = set(range(1, customers + 1)), 0, 0.0
+    while unvisited:
+        nearest = min(unvisited, key=lambda c: np.hypot(*(coords[c] - coords[current])))
+        reference += np.hypot(*(coords[nearest] - coords[current]))
+        unvisited.remove(nearest)
+        current = nearest
+    reference += np.hypot(*(coords[0] - coords[current]))
+
+    filename = os.path.join(directory, f"S-n{customers + 1}-k{vehicles}.evrp")
+    with open(filename, 'w') as f:
+        f.write(f"Name: synthetic {customers}\nTYPE: EVRP\nOPTIMAL_VALUE: {reference:.6f}\n"
+                f"VEHICLES: {vehicles}\nDIMENSION: {customers + 1}\nSTATIONS: {num_stations}\n"
+                f"CAPACITY: {capacity}\nENERGY_CAPACITY: 3000\nENERGY_CONSUMPTION: 1.00\nEDGE_WEIGHT_FORMAT: EUC_2D\n"
+                "NODE_COORD_SECTION\n")
+        for node, (x, y) in enumerate(coords, 1):
+            f.write(f"{node} {x:.2f} {y:.2f}\n")
+        f.write("DEMAND_SECTION\n1 0\n")
+        for node, demand in enumerate(demands, 2):
+            f.write(f"{node} {demand}\n")
+        f.write("STATIONS_COORD_SECTION\n")
+        for node in range(customers + 2, customers + 2 + num_stations):
+            f.write(f"{node}\n")
+        f.write("DEPOT_SECTION\n1\n-1\nEOF\n")
+    return filename
+
+
+def time_call(fn: Callable[[], object], number: int, repeat: int) -> Dict[str, float]:
+    """Tempo por chamada em microssegundos (média e mínimo entre as repetições)."""
+    timings = [t / number * 1e6 for t in timeit.Timer(fn).repeat(repeat=repeat, number=number)]
+    return {'mean_us': float(np.mean(timings)), 'min_us': float(min(timings))}
+
+
+def benchmark_hot_paths(solver: AlgoritmoGeneticoEVRP, number: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    random.seed(0)
+    np.random.seed(0)
+    population = solver._initialize_population()
+    p1, p2 = population[0], population[1]
+    invalid = CromossomoEVRP(solver, p1.genes[:-1] + [p1.genes[0]])
+    evaluator = AvaliadorLoteEVRP(solver.instance)
+    batch = evaluator.pack([ind.genes for ind in population])
+
+    config = solver.config
+    crossover_rate, mutation_rate = config.crossover_rate, config.mutation_rate
+    config.crossover_rate = config.mutation_rate = 1.0  # Mede sempre o operador, não o atalho "return self"
+    try:
+        results = {
+            'chromosome_init': time_call(lambda: CromossomoEVRP(solver), number, repeat),
+            'chromosome_evaluate': time_call(lambda: CromossomoEVRP(solver, p1.genes), number, repeat),
+            'crossover': time_call(lambda: p1.crossover(p2), number, repeat),
+            'mutate': time_call(lambda: p1.mutate(), number, repeat),
+            'repair': time_call(lambda: invalid.repair(), number, repeat),
+            'select_parent': time_call(lambda: solver._select_parent(population), number, repeat),
+            'batch_evaluate': time_call(lambda: evaluator.evaluate(batch), number, repeat),
+        }
+    finally:
+        config.crossover_rate, config.mutation_rate = crossover_rate, mutation_rate
+    if config.evaluation_mode == 'batch':
+        # A geração do modo 'batch' opera sobre a matriz de genes, não sobre objetos CromossomoEVRP
+        genes, fitness = solver._initialize_population_batch(evaluator)
+        operators = OperadoresLoteEVRP(solver.instance, genes.shape[1])
+        generation = lambda: solver._next_generation_batch(evaluator, operators, genes, fitness, float('inf'))
+    else:
+        generation = lambda: solver._next_generation(list(population), float('inf'))
+    results['generation'] = time_call(generation, max(1, number // 50), repeat)
+    return results
+
+
+def benchmark_end_to_end(solver: AlgoritmoGeneticoEVRP, budget: int, target_gap: float, seed: int) -> Dict[str, Optional[float]]:
+    result = solver._execute_run(1, budget, seed)
+    target = solver.instance.optimal_value * (1 + target_gap / 100)
+    time_to_target = next((elapsed for fitness, elapsed in zip(result['history'], result['elapsed']) if fitness <= target), None)
+    return {
+        'evaluations': solver.evaluation_count,
+        'seconds': result['time'],
+        'evaluations_per_second': solver.evaluation_count / result['time'] if result['time'] > 0 else None,
+        'best_gap': result['gap'],
+        'time_to_target': time_to_target,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Lista as métricas que pioraram mais que `tolerance` (fração) em relação ao baseline.
+
+    Levanta ValueError se o baseline foi gravado com outros parâmetros (COMPARABLE_META).
+    """
+    base_meta = baseline.get('meta', {})
+    mismatches = [f"{key}: {base_meta.get(key)!r} != {current['meta'][key]!r}"
+                  for key in COMPARABLE_META if base_meta.get(key) != current['meta'][key]]
+    if mismatches:
+        raise ValueError("baseline gravado com parâmetros diferentes (" + "; ".join(mismatches) + ")")
+    regressions = []
+    for name, metrics in current['instances'].items():
+        base = baseline.get('instances', {}).get(name)
+        if base is None: continue
+        for op, timing in metrics['hot_paths'].items():
+            old = base['hot_paths'].get(op, {}).get('min_us')
+            if old and timing['min_us'] > old * (1 + tolerance):
+                regressions.append(f"{name} {op}: {old:.1f}us -> {timing['min_us']:.1f}us")
+        old_rate = base['end_to_end'].get('evaluations_per_second')
+        new_rate = metrics['end_to_end'].get('evaluations_per_second')
+        if old_rate and new_rate and new_rate < old_rate * (1 - tolerance):
+            regressions.append(f"{name} evaluations_per_second: {old_rate:,.0f} -> {new_rate:,.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('instances', nargs='*', default=["E-n23-k3.evrp", "E-n51-k5.evrp"])
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[100, 200], help="Número de clientes das instâncias sintéticas")
+    parser.add_argument('--mode', choices=['object', 'batch'], default='object', help="ConfigEVRP.evaluation_mode da execução completa")
+    parser.add_argument('--number', type=int, default=500, help="Chamadas por repetição nas medições isoladas")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=int, default=30000, help="Avaliações da execução completa")
+    parser.add_argument('--target-gap', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    report = {
+        'version': BENCHMARK_VERSION,
+        'meta': {'python': sys.version.split()[0], 'numpy': np.__version__, 'platform': platform.platform(),
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mode': args.mode, 'budget': args.budget,
+                 'target_gap': args.target_gap, 'seed': args.seed, 'number': args.number, 'repeat': args.repeat},
+        'instances': {},
+    }
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        files = list(args.instances)
+        files += [write_synthetic_instance(synthetic_dir, size, args.seed + size) for size in args.synthetic]
+        for instance_file in files:
+            config = ConfigEVRP(runs=1, seed=args.seed, evaluation_mode=args.mode, max_stagnation=10**9)
+            solver = AlgoritmoGeneticoEVRP(instance_file, config)
+            solver.show_progress = False
+            hot_paths = benchmark_hot_paths(solver, args.number, args.repeat)
+            end_to_end = benchmark_end_to_end(solver, args.budget, args.target_gap, args.seed)
+            report['instances'][solver.instance.name] = {'customers': solver.instance.customers,
+                                                         'hot_paths': hot_paths, 'end_to_end': end_to_end}
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "=" * 30 + " Benchmark " + "=" * 30)
+    for name, metrics in report['instances'].items():
+        e2e = metrics['end_to_end']
+        ttt = f"{e2e['time_to_target']:.2f}s" if e2e['time_to_target'] is not None else "não atingido"
+        print(f"{name} ({metrics['customers']} clientes): {e2e['evaluations_per_second']:,.0f} aval/s, "
+              f"gap {e2e['best_gap']:.2f}%, tempo até o alvo: {ttt}")
+        for op, timing in metrics['hot_paths'].items():
+            print(f"    {op:<20}{timing['min_us']:>12.1f} us")
+    print(f"Resultados salvos em: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(report, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"\nComparação recusada: {e}.")
+            sys.exit(2)
+        if regressions:
+            print(f"\nRegressões acima de {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNenhuma regressão acima de {args.tolerance:.0%} em relação a {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
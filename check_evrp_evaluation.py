@@ -0,0 +1,108 @@
+"""Confere a inserção de estações de recarga contra uma busca exaustiva.
+
+Uso:
+    python check_evrp_evaluation.py [instancias...] --tours 400 --seed 1
+
+Sorteia tours que respeitam CAPACITY e compara o custo calculado por
+InstanciaEVRP.evaluate_evrp_route com uma busca exaustiva sobre os estados "última recarga na
+aresta e, na estação s" (mesmo modelo: no máximo uma estação por aresta, recarga completa),
+que examina todas as estações de cada aresta. Também confere que o tour invertido tem o mesmo
+custo e que a rota devolvida com as estações respeita a bateria. Termina com código 1 se
+houver divergência.
+"""
+import argparse
+import random
+import sys
+from typing import List
+
+import numpy as np
+
+from evrp_solver import InstanciaEVRP
+
+
+def exhaustive_tour_cost(instance: InstanciaEVRP, tour: List[int]) -> float:
+    """Menor custo do tour (depósito ... depósito) com estações inseridas, ou inf se inviável."""
+    if instance.capacity > 0 and sum(instance.demands.get(node, 0) for node in tour) > instance.capacity:
+        return float('inf')
+    D, h, full = instance.dist_matrix, instance.energy_consumption, instance.energy_capacity
+    stations = [s for s in sorted(instance.station_nodes) if s != instance.depot]
+    m = len(tour) - 1
+    prefix = [0.0]
+    for k in range(m):
+        prefix.append(prefix[-1] + float(D[tour[k], tour[k + 1]]))
+
+    # states[e]: {estação: custo} ao chegar em tour[e] tendo recarregado na aresta (e - 1, e)
+    states = [dict() for _ in range(m + 1)]
+    states[0][None] = 0.0
+    best = float('inf')
+    for e in range(m + 1):
+        for station, cost in states[e].items():
+            battery = full if station is None else full - h * float(D[station, tour[e]])
+            if h * (prefix[m] - prefix[e]) <= battery:
+                best = min(best, cost + prefix[m] - prefix[e])
+            for l in range(e + 1, m + 1):
+                run = prefix[l - 1] - prefix[e]
+                if h * run > battery: break
+                i, j = tour[l - 1], tour[l]
+                for s in stations:
+                    if h * (run + float(D[i, s])) > battery or h * float(D[s, j]) > full: continue
+                    new_cost = cost + run + float(D[i, s]) + float(D[s, j])
+                    if new_cost < states[l].get(s, float('inf')):
+                        states[l][s] = new_cost
+    return best
+
+
+def battery_feasible(instance: InstanciaEVRP, charged_route: List[int]) -> bool:
+    h, full, battery = instance.energy_consumption, instance.energy_capacity, instance.energy_capacity
+    for u, v in zip(charged_route[:-1], charged_route[1:]):
+        battery -= h * float(instance.dist_matrix[u, v])
+        if battery < -1e-9: return False
+        if v in instance.station_nodes or v == instance.depot: battery = full
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('instances', nargs='*', default=["E-n23-k3.evrp", "E-n51-k5.evrp"])
+    parser.add_argument('--tours', type=int, default=400, help="Tours sorteados por instância")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    for instance_file in args.instances:
+        instance = InstanciaEVRP(instance_file)
+        customers = list(range(2, 2 + instance.customers))
+        charged = 0
+        for _ in range(args.tours):
+            rng.shuffle(customers)
+            tour, load = [], 0
+            for customer in customers:
+                if instance.capacity > 0 and load + instance.demands.get(customer, 0) > instance.capacity: break
+                tour.append(customer)
+                load += instance.demands.get(customer, 0)
+            route = [instance.depot] + tour + [instance.depot]
+            expected = exhaustive_tour_cost(instance, route)
+            cost, charged_route = instance.evaluate_evrp_route(route)
+            reversed_cost, _ = instance.evaluate_evrp_route(route[::-1])
+            charged += len(charged_route) > len(route)
+            problems = []
+            if not (cost == expected or np.isclose(cost, expected, rtol=1e-9, atol=1e-9)):
+                problems.append(f"custo {cost:.6f} != exaustivo {expected:.6f}")
+            if reversed_cost != cost:  # Exato: o cache de fitness trata os dois sentidos como a mesma rota
+                problems.append(f"invertido {reversed_cost:.6f} != {cost:.6f}")
+            if np.isfinite(cost) and not battery_feasible(instance, charged_route):
+                problems.append("rota com estações viola a bateria")
+            if problems:
+                failures += 1
+                print(f"{instance.name} {route}: " + "; ".join(problems))
+        print(f"{instance.name}: {args.tours} tours conferidos ({charged} com recarga)")
+
+    if failures:
+        print(f"\n{failures} divergência(s) encontrada(s).")
+        sys.exit(1)
+    print("\nNenhuma divergência.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
 import numpy as np
 import random
 import time
-from math import sqrt
+from math import sqrt, log, fsum
 from tqdm import tqdm
 import csv
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict, replace
 from typing import Dict, Tuple, List, Optional, Set
 import matplotlib.pyplot as plt
+import hashlib
+import json
+import glob
+import pickle
+import shutil
+import tempfile
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from collections import deque, OrderedDict, Counter
+from multiprocessing import shared_memory
 
-# --- Configuração (sem alterações) ---
+# --- Configuração ---
 @dataclass
 class ConfigEVRP:
     pop_size: int = 150
@@ -19,11 +31,98 @@ class ConfigEVRP:
     tournament_size: int = 5
     max_stagnation: int = 100
     runs: int = 20
-    diversity_threshold: float = 0.15
+    diversity_threshold: float = 0.15  # Entropia normalizada das arestas abaixo da qual há imigração (com diversity_control)
+    evaluation_mode: str = 'object'  # 'object' (um CromossomoEVRP por vez) ou 'batch' (geração inteira em NumPy)
+    delta_evaluation: bool = True  # Fitness de troca/inversão calculado em O(1) a partir do pai
+    delta_cross_check: bool = False  # Depuração: confere cada delta contra a avaliação completa
+    workers: int = 1  # Processos usados para distribuir as execuções independentes
+    seed: Optional[int] = None  # Semente base; a semente de cada execução é derivada dela
+    # Modelo de ilhas (run_islands)
+    islands: int = 4
+    migration_interval: int = 10  # Gerações entre migrações
+    migrants: int = 2  # Melhores indivíduos enviados por ilha a cada migração
+    migration_topology: str = 'ring'  # 'ring' ou 'full'
+    # Modo memético: busca local granular aplicada aos melhores indivíduos
+    local_search: bool = False
+    ls_interval: int = 10  # Gerações entre aplicações da busca local
+    ls_elite: int = 5  # Quantos dos melhores indivíduos são melhorados
+    ls_neighbors: int = 8  # Tamanho das listas de candidatos (k vizinhos mais próximos)
+    ls_max_moves: int = 1000  # Profundidade: movimentos de melhoria aplicados por indivíduo
+    decoder: str = 'separators'  # 'separators' (depósitos nos genes) ou 'split' (permutação de clientes + Split ótimo)
+    evrp_constraints: bool = False  # Avalia capacidade de carga e bateria, inserindo estações de recarga
+    # Cache de fitness (memoização por rota decodificada)
+    fitness_cache: bool = False
+    cache_size: int = 100_000  # Número máximo de rotas guardadas (descarte LRU)
+    cache_hits_count: bool = True  # Se False, filhos que não exigiram avaliação nova não consomem orçamento
+    # Distâncias: 'dense' (float64), 'float32' (em blocos), 'memmap' (float32 em disco) ou 'on_demand'
+    distance_backend: str = 'dense'
+    distance_cache_dir: str = 'cache'  # Onde ficam as matrizes 'memmap' e o cache binário das instâncias
+    instance_cache: bool = False  # Reaproveita instâncias já processadas (.npz invalidado pelo hash do arquivo)
+    # Telemetria: tempo/contagem por operador e registros JSONL por geração em results/
+    telemetry: bool = False
+    telemetry_interval: int = 1  # Amostragem: um registro a cada N gerações (os contadores se acumulam entre registros)
+    telemetry_batch: int = 50  # Registros mantidos em memória entre escritas no arquivo
+    # Relatórios: 'sync' (no processo principal, após cada execução) ou 'async' (processo separado alimentado por fila)
+    reporting: str = 'sync'
+    plots: str = 'each'  # 'each' (ao fim de cada execução), 'deferred' (todos no final), 'best' (só a melhor execução) ou 'none'
+    # Modo "anytime": critérios de parada adicionais e checkpoints para retomar experimentos interrompidos
+    time_budget: Optional[float] = None  # Segundos de relógio por execução
+    target_gap: Optional[float] = None  # Para a execução ao atingir este gap (%) em relação a OPTIMAL_VALUE
+    checkpoint_interval: int = 0  # Gerações entre checkpoints (0 desliga)
+    checkpoint_dir: str = 'checkpoints'
+    # Controle de diversidade: rejeita filhos com rota repetida e injeta imigrantes quando a diversidade cai
+    diversity_control: bool = False
+    immigration_rate: float = 0.5  # Fração (os piores) substituída por indivíduos aleatórios abaixo de diversity_threshold
+    # Decomposição (run_decomposed): grupos de clientes resolvidos como sub-instâncias independentes
+    decomposition: str = 'sweep'  # 'sweep' (ângulo em torno do depósito) ou 'kmeans' (sobre as coordenadas)
+    cluster_size: int = 50  # Clientes desejados por grupo (o número de grupos não passa de VEHICLES)
+    decomposition_rounds: int = 3  # Rodadas de troca de clientes de fronteira entre grupos vizinhos
+    boundary_neighbors: int = 5  # Vizinhos mais próximos consultados para decidir se um cliente está na fronteira
+    # População inicial semeada: arquivo de elite em disco e heurísticas construtivas
+    seed_fraction: float = 0.0  # Fração da população inicial vinda das sementes (0 mantém a população toda aleatória)
+    seed_heuristics: Tuple[str, ...] = ('nearest_neighbor', 'savings', 'sweep')
+    elite_archive: bool = False  # Guarda as melhores rotas distintas de cada experimento e as usa como sementes
+    archive_dir: str = 'archive'
+    archive_size: int = 20  # Rotas distintas mantidas por instância
 
-# --- Classe da Instância (sem alterações) ---
+# --- Distâncias sob demanda ---
+class DistanciaSobDemanda:
+    """Substituto da matriz de distâncias que calcula as distâncias euclidianas a partir das
+    coordenadas a cada acesso, sem armazenar nada de tamanho N x N.
+
+    Aceita a mesma indexação usada com a matriz densa: pares de índices (escalares, vetores
+    ou np.ix_), fatias e linhas inteiras (`dist[i]`); nós inexistentes têm distância inf.
+    """
+    def __init__(self, coords: Dict[int, Tuple[float, float]]):
+        size = max(coords) + 1
+        self.xy = np.full((size, 2), np.nan)
+        for node, xy in coords.items():
+            self.xy[node] = xy
+        self.shape = (size, size)
+        self.dtype = np.dtype(np.float64)
+        self.nbytes = self.xy.nbytes
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        row_key, col_key = key
+        rows, cols = (np.arange(self.shape[0])[k] if isinstance(k, slice) else np.asarray(k) for k in key)
+        # Como no ndarray: uma fatia combina com o outro índice em produto externo, não elemento a elemento
+        if isinstance(row_key, slice):
+            rows = rows.reshape((-1,) + (1,) * max(cols.ndim, 1 if isinstance(col_key, slice) else 0))
+        elif isinstance(col_key, slice):
+            rows = rows[..., np.newaxis]
+        dist = np.hypot(self.xy[rows, 0] - self.xy[cols, 0], self.xy[rows, 1] - self.xy[cols, 1])
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        return dist if dist.ndim else float(dist)
+
+
+# --- Classe da Instância ---
 class InstanciaEVRP:
-    def __init__(self, filename: str):
+    CACHE_VERSION = 1  # Incrementar sempre que o conteúdo do cache binário mudar
+
+    def __init__(self, filename: str, dist_matrix: Optional[np.ndarray] = None,
+                 distance_backend: str = 'dense', cache_dir: str = 'cache', use_cache: bool = False):
         self.filename = filename
         self.name = os.path.basename(filename)
         self.coords: Dict[int, Tuple[float, float]] = {}
@@ -34,10 +133,36 @@ class InstanciaEVRP:
         self.num_stations: int = 0
         self.station_nodes: Set[int] = set() # Adicionado para plotar estações
         self.depot: int = 1
+        self.capacity: float = 0.0
+        self.energy_capacity: float = 0.0
+        self.energy_consumption: float = 0.0
+        self.distance_backend = distance_backend
+        self.cache_dir = cache_dir
         self.dist_matrix: np.ndarray = np.array([])
+        self.demand_array: np.ndarray = np.array([])
+        # Tabela de estações, calculada no primeiro uso das restrições do EVRP
+        self.station_array: Optional[np.ndarray] = None  # Estações utilizáveis (sem o depósito)
+        self.to_station: Optional[np.ndarray] = None  # to_station[i, k] = dist[i, station_array[k]]
+        self.from_station: Optional[np.ndarray] = None  # from_station[j, k] = dist[station_array[k], j]
+        self._edge_station_cache: Dict[Tuple[int, int], List[Tuple[float, float, float, int]]] = {}
         
-        self._load_instance()
-        self._build_distance_matrix()
+        cache_path = self._cache_path() if use_cache else None
+        # A matriz guardada só é lida quando vai ser usada (backend denso e nenhuma matriz recebida)
+        load_matrix = dist_matrix is None and distance_backend == 'dense'
+        cached_matrix = self._load_cache(cache_path, load_matrix) if cache_path else None
+        if cached_matrix is None:
+            self._load_instance()
+        self.demand_array = np.zeros(max(self.coords) + 1)
+        for node, demand in self.demands.items():
+            if node < len(self.demand_array): self.demand_array[node] = demand
+        if dist_matrix is not None:
+            self.dist_matrix = dist_matrix  # Matriz já calculada (p.ex. memória compartilhada entre processos)
+        elif cached_matrix is not None and cached_matrix.size:
+            self.dist_matrix = cached_matrix
+        else:
+            self._build_distance_matrix()
+        if cache_path and cached_matrix is None:
+            self._save_cache(cache_path)
     
     def _load_instance(self):
         try:
@@ -50,6 +175,9 @@ class InstanciaEVRP:
                 elif line.startswith("VEHICLES"): self.vehicles = int(line.split()[-1])
                 elif line.startswith("DIMENSION"): self.customers = int(line.split()[-1]) - 1
                 elif line.startswith("STATIONS:"): self.num_stations = int(line.split()[-1])
+                elif line.startswith("CAPACITY"): self.capacity = float(line.split()[-1])
+                elif line.startswith("ENERGY_CAPACITY"): self.energy_capacity = float(line.split()[-1])
+                elif line.startswith("ENERGY_CONSUMPTION"): self.energy_consumption = float(line.split()[-1])
                 elif line in ["NODE_COORD_SECTION", "DEMAND_SECTION", "STATIONS_COORD_SECTION", "DEPOT_SECTION"]:
                     section = line
                     continue
@@ -59,6 +187,9 @@ class InstanciaEVRP:
                     if len(parts) >= 3:
                         idx, x, y = int(parts[0]), float(parts[1]), float(parts[2])
                         self.coords[idx] = (x, y)
+                elif section == "DEMAND_SECTION":
+                    parts = line.split()
+                    if len(parts) >= 2: self.demands[int(parts[0])] = int(parts[1])
                 elif section == "STATIONS_COORD_SECTION":
                     self.station_nodes.add(int(line.split()[0]))
                 elif section == "DEPOT_SECTION":
@@ -70,46 +201,682 @@ class InstanciaEVRP:
         except (IOError, ValueError) as e:
             raise ValueError(f"Erro ao carregar ou processar o arquivo da instância '{self.filename}': {e}")
     
+    # --- Cache binário (.npz) ---
+    def _cache_path(self) -> str:
+        with open(self.filename, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self.name}.{digest}.npz")
+
+    def _load_cache(self, path: str, load_matrix: bool = True) -> Optional[np.ndarray]:
+        """Restaura a instância de `path`; retorna a matriz densa guardada (vazia se não houver ou se
+        `load_matrix` for False) ou None se o cache não existir, estiver corrompido ou for de outra versão."""
+        if not os.path.exists(path): return None
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != self.CACHE_VERSION: return None
+                (self.optimal_value, vehicles, customers, num_stations, depot,
+                 self.capacity, self.energy_capacity, self.energy_consumption) = data['scalars'].tolist()
+                self.vehicles, self.customers, self.num_stations, self.depot = int(vehicles), int(customers), int(num_stations), int(depot)
+                self.coords = {int(node): (float(x), float(y)) for node, (x, y) in zip(data['coord_ids'], data['coords'])}
+                self.demands = {int(node): int(demand) for node, demand in zip(data['demand_ids'], data['demands'])}
+                self.station_nodes = set(data['stations'].tolist())
+                dist_matrix = data['dist_matrix'] if load_matrix else np.array([])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"AVISO: cache da instância '{self.name}' ignorado ({e}).")
+            return None
+        print(f"\nInstância carregada do cache: {self.name}")
+        print(f"Clientes: {self.customers}, Veículos: {self.vehicles}, Estações: {self.num_stations}")
+        return dist_matrix
+
+    def _save_cache(self, path: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        coord_ids = sorted(self.coords)
+        demand_ids = sorted(self.demands)
+        dist_matrix = self.dist_matrix if self.distance_backend == 'dense' else np.array([])
+        # Nome temporário único por processo (vários workers podem gravar a mesma instância) e fora
+        # do padrão `nome.*.npz`, para a limpeza abaixo nunca apagar a gravação de outro processo
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{self.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, version=self.CACHE_VERSION,
+                         scalars=np.array([self.optimal_value, self.vehicles, self.customers, self.num_stations, self.depot,
+                                           self.capacity, self.energy_capacity, self.energy_consumption]),
+                         coord_ids=np.array(coord_ids, dtype=np.int64), coords=np.array([self.coords[i] for i in coord_ids]).reshape(-1, 2),
+                         demand_ids=np.array(demand_ids, dtype=np.int64), demands=np.array([self.demands[i] for i in demand_ids], dtype=np.int64),
+                         stations=np.array(sorted(self.station_nodes), dtype=np.int64), dist_matrix=dist_matrix)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+        for stale in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(self.name)}.*.npz")):
+            if stale != path:  # Versões antigas do mesmo arquivo
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass  # Já removida por outro processo
+
     def _build_distance_matrix(self):
-        nodes = sorted(self.coords.keys())
-        max_node_id = max(nodes)
-        self.dist_matrix = np.full((max_node_id + 1, max_node_id + 1), fill_value=np.inf)
-        coords_array = np.array([self.coords[i] for i in nodes])
-        diff = coords_array[:, np.newaxis, :] - coords_array[np.newaxis, :, :]
-        self.dist_matrix[np.ix_(nodes, nodes)] = np.sqrt(np.sum(diff**2, axis=-1))
+        if self.distance_backend == 'dense':
+            nodes = sorted(self.coords.keys())
+            max_node_id = max(nodes)
+            self.dist_matrix = np.full((max_node_id + 1, max_node_id + 1), fill_value=np.inf)
+            coords_array = np.array([self.coords[i] for i in nodes])
+            diff = coords_array[:, np.newaxis, :] - coords_array[np.newaxis, :, :]
+            self.dist_matrix[np.ix_(nodes, nodes)] = np.sqrt(np.sum(diff**2, axis=-1))
+        elif self.distance_backend == 'float32':
+            size = max(self.coords) + 1
+            self.dist_matrix = self._fill_distances(np.empty((size, size), dtype=np.float32))
+        elif self.distance_backend == 'memmap':
+            self.dist_matrix = self._memmap_distances()
+        elif self.distance_backend == 'on_demand':
+            self.dist_matrix = DistanciaSobDemanda(self.coords)
+        else:
+            raise ValueError(f"Backend de distâncias desconhecido: '{self.distance_backend}'")
+
+    def _fill_distances(self, out: np.ndarray, block_rows: int = 256) -> np.ndarray:
+        """Preenche `out` bloco a bloco de linhas, sem o temporário N x N x 2 da versão densa."""
+        nodes = np.array(sorted(self.coords.keys()))
+        xy = np.array([self.coords[i] for i in nodes])
+        out[:] = np.inf
+        for start in range(0, len(nodes), block_rows):
+            block = slice(start, start + block_rows)
+            dist = np.hypot(xy[block, 0, np.newaxis] - xy[np.newaxis, :, 0], xy[block, 1, np.newaxis] - xy[np.newaxis, :, 1])
+            out[np.ix_(nodes[block], nodes)] = dist
+        return out
+
+    def _memmap_distances(self) -> np.memmap:
+        """Matriz float32 em disco, identificada pelo hash das coordenadas e reaproveitada entre
+        execuções; processos que a abrem compartilham as mesmas páginas via cache do sistema."""
+        size = max(self.coords) + 1
+        xy = np.array([(node, *self.coords[node]) for node in sorted(self.coords)])
+        digest = hashlib.sha1(xy.tobytes()).hexdigest()[:16]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{self.name}.{digest}.dist.f32")
+        if os.path.exists(path) and os.path.getsize(path) == size * size * 4:
+            return np.memmap(path, dtype=np.float32, mode='r', shape=(size, size))
+        # Arquivo temporário único: outro processo pode estar gerando a mesma matriz ao mesmo tempo
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{self.name}.", suffix='.tmp')
+        os.close(fd)
+        try:
+            matrix = self._fill_distances(np.memmap(tmp_path, dtype=np.float32, mode='w+', shape=(size, size)))
+            matrix.flush()
+            del matrix
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+        return np.memmap(path, dtype=np.float32, mode='r', shape=(size, size))
+
+    def _build_station_table(self):
+        """Pré-calcula as distâncias de cada nó até cada estação e de cada estação até cada nó (N x S)."""
+        size = self.dist_matrix.shape[0]
+        self.station_array = np.array([s for s in sorted(self.station_nodes) if s < size and s != self.depot], dtype=np.int64)
+        self._edge_station_cache = {}
+        self.to_station = np.array(self.dist_matrix[:, self.station_array], dtype=np.float64).reshape(size, -1)
+        self.from_station = np.array(self.dist_matrix[self.station_array, :], dtype=np.float64).reshape(-1, size).T
+
+    def evaluate_evrp_route(self, route: List[int]) -> Tuple[float, List[int]]:
+        """Custo da rota com as restrições do EVRP e a rota com as visitas às estações inseridas.
+
+        Cada tour deve respeitar CAPACITY; a bateria (ENERGY_CAPACITY, gasto ENERGY_CONSUMPTION
+        por unidade de distância) é recarregada por completo em cada estação. As estações são
+        escolhidas por programação dinâmica exata sobre as arestas do tour (no máximo uma
+        estação por aresta), considerando todas as estações.
+        Retorna (inf, route) se algum tour for inviável.
+        """
+        if self.station_array is None:
+            self._build_station_table()
+        charged_route, costs = [self.depot], []
+        tour = [self.depot]
+        for node in route[1:]:
+            tour.append(node)
+            if node != self.depot: continue
+            if len(tour) > 2:
+                # Avalia no mesmo sentido da chave canônica do cache (menor extremo primeiro): o custo
+                # de um tour e do seu inverso fica idêntico até o último bit
+                reverse = tour[1] > tour[-2]
+                cost, charged_tour = self._evaluate_evrp_tour(tour[::-1] if reverse else tour)
+                if reverse: charged_tour = charged_tour[::-1]
+                if not np.isfinite(cost): return float('inf'), route
+                costs.append(cost)
+                charged_route.extend(charged_tour[1:])
+            tour = [self.depot]
+        return fsum(costs), charged_route  # Soma exata: não depende da ordem dos tours
+
+    def _evaluate_evrp_tour(self, tour: List[int]) -> Tuple[float, List[int]]:
+        if self.capacity > 0 and sum(self.demands.get(node, 0) for node in tour) > self.capacity:
+            return float('inf'), tour
+
+        D = self.dist_matrix
+        m = len(tour) - 1
+        prefix = [0.0]
+        for k in range(m):
+            prefix.append(prefix[-1] + D[tour[k], tour[k + 1]])
+        h, full = self.energy_consumption, self.energy_capacity
+        if h <= 0 or full <= 0 or h * prefix[m] <= full:
+            return prefix[m], tour
+
+        # labels[k]: fronteira de Pareto (custo, bateria) ao chegar em tour[k]. Um caminho mais caro que
+        # chega com mais carga pode ser o único a completar o tour, então não pode ser descartado
+        labels = [[(0.0, full, -1, -1)]]  # (custo, bateria, rótulo anterior em labels[k - 1], estação na aresta)
+        for k in range(m):
+            direct = prefix[k + 1] - prefix[k]
+            options = self._edge_stations(tour[k], tour[k + 1])
+            candidates = []
+            for index, (cost, battery, _, _) in enumerate(labels[k]):
+                if h * direct <= battery:
+                    candidates.append((cost + direct, battery - h * direct, index, -1))
+                for to_station, via_cost, arrival, station in options:
+                    if h * to_station <= battery:
+                        candidates.append((cost + via_cost, arrival, index, station))
+            candidates.sort(key=lambda label: (label[0], -label[1]))
+            # O resto do tour custa ao menos a distância direta (desigualdade triangular), então o rótulo
+            # mais barato que termina sem recarga limita todos os mais caros que ele
+            rest = prefix[m] - prefix[k + 1]
+            front, most_battery = [], -1.0
+            for label in candidates:
+                if label[1] > most_battery:  # Mais caro só sobrevive se chegar com mais bateria
+                    front.append(label)
+                    most_battery = label[1]
+                    if h * rest <= most_battery: break
+            if not front:
+                return float('inf'), tour
+            labels.append(front)
+            if h * rest <= front[0][1]:
+                break  # O mais barato já termina direto: nenhum outro pode ficar abaixo dele
+
+        last = len(labels) - 1
+        final_cost, index = labels[last][0][0] + prefix[m] - prefix[last], 0
+        stations_on_edge = {}
+        for k in range(last, 0, -1):
+            _, _, previous, station = labels[k][index]
+            if station >= 0: stations_on_edge[k] = station
+            index = previous
+        charged_tour = [tour[0]]
+        for l in range(1, m + 1):
+            if l in stations_on_edge: charged_tour.append(stations_on_edge[l])
+            charged_tour.append(tour[l])
+        return final_cost, charged_tour
+
+    def _edge_stations(self, i: int, j: int) -> List[Tuple[float, float, float, int]]:
+        """Estações úteis para recarregar entre i e j, como (dist[i, s], dist[i, s] + dist[s, j], bateria
+        na chegada a j, s), em ordem crescente de dist[i, s]. Ficam só as não dominadas: uma estação mais
+        distante de i e também de j nunca é melhor. Calculadas sob demanda e guardadas por aresta."""
+        key = (i, j)
+        options = self._edge_station_cache.get(key)
+        if options is None:
+            h, full = self.energy_consumption, self.energy_capacity
+            to_station, from_station = self.to_station[i], self.from_station[j]
+            options, closest_to_j = [], np.inf
+            for k in np.lexsort((from_station, to_station)):
+                if from_station[k] < closest_to_j and h * from_station[k] <= full:
+                    options.append((float(to_station[k]), float(to_station[k] + from_station[k]),
+                                    float(full - h * from_station[k]), int(self.station_array[k])))
+                    closest_to_j = from_station[k]
+            if len(self._edge_station_cache) >= 1_000_000: self._edge_station_cache.clear()
+            self._edge_station_cache[key] = options
+        return options
 
     def calculate_route_distance(self, route: List[int]) -> float:
         if len(route) < 2: return 0.0
-        return self.dist_matrix[route[:-1], route[1:]].sum()
+        # Soma exata: o total não depende da ordem nem do sentido dos tours (ver CacheFitnessEVRP)
+        return fsum(self.dist_matrix[route[:-1], route[1:]].tolist())
+
+    def split_giant_tour(self, sequence: List[int], capacitated: bool = False) -> List[int]:
+        """Split de Prins: particiona de forma ótima uma sequência de clientes em até `vehicles` tours.
+
+        O custo do tour que cobre as posições i..j-1 vem de somas prefixas das distâncias
+        consecutivas; o caminho mínimo é calculado em camadas (uma por veículo) para
+        respeitar o limite de veículos. Com `capacitated`, tours que excedem CAPACITY são
+        proibidos. Depósitos presentes na sequência são ignorados.
+        """
+        depot = self.depot
+        customers = np.array([node for node in sequence if node != depot], dtype=np.int64)
+        n = len(customers)
+        if n == 0: return [depot]
+
+        links = np.concatenate(([0.0], np.cumsum(self.dist_matrix[customers[:-1], customers[1:]])))
+        starts, ends = np.arange(n)[:, np.newaxis], np.arange(1, n + 1)[np.newaxis, :]
+        tour_cost = (self.dist_matrix[depot, customers][:, np.newaxis] + links[ends - 1] - links[starts]
+                     + self.dist_matrix[customers[ends - 1], depot])
+        tour_cost[starts >= ends] = np.inf
+        if capacitated and self.capacity > 0:
+            loads = np.concatenate(([0.0], np.cumsum(self.demand_array[customers])))
+            tour_cost[loads[ends] - loads[starts] > self.capacity] = np.inf
+
+        layer = np.full(n + 1, np.inf)
+        layer[0] = 0.0
+        predecessors, best_cost, best_tours = [], np.inf, 0
+        for num_tours in range(1, max(1, self.vehicles) + 1):
+            totals = layer[:n, np.newaxis] + tour_cost
+            pred = np.argmin(totals, axis=0)
+            layer = np.concatenate(([np.inf], totals[pred, np.arange(n)]))
+            predecessors.append(pred)
+            if layer[n] < best_cost:
+                best_cost, best_tours = layer[n], num_tours
+        if not np.isfinite(best_cost): return [depot]
+
+        tours, end = [], n
+        for pred in reversed(predecessors[:best_tours]):
+            start = int(pred[end - 1])
+            tours.append(customers[start:end].tolist())
+            end = start
+        route = [depot]
+        for tour in reversed(tours):
+            route.extend(tour)
+            route.append(depot)
+        return route
+
+# --- Operadores genéticos sobre listas de genes ---
+# Compartilhados pelo modo 'object' (CromossomoEVRP) e pelo modo 'batch' (AvaliadorLoteEVRP),
+# que manipula apenas os genes e avalia a geração inteira de uma só vez.
+def generate_random_genes(customers: int, depot: int, vehicles: int) -> List[int]:
+    genes = list(range(2, 2 + customers))
+    random.shuffle(genes)
+    if vehicles > 1:
+        num_splits = vehicles - 1
+        if len(genes) > num_splits:
+            split_points = sorted(random.sample(range(1, len(genes)), num_splits))
+            offset = 0
+            for pos in split_points:
+                genes.insert(pos + offset, depot)
+                offset += 1
+    return genes
+
+def crossover_genes(p1_genes: List[int], p2_genes: List[int], customers: int, depot: int) -> List[int]:
+    """Crossover de ordem (OX) entre duas listas de genes."""
+    size = len(p1_genes)
+    if len(p2_genes) != size:
+        p2_genes = (p2_genes * (size // len(p2_genes) + 1))[:size]
+
+    child_genes = [None] * size
+    start, end = sorted(random.sample(range(size), 2))
+    child_genes[start:end] = p1_genes[start:end]
+    segment = set(p1_genes[start:end])
+
+    p2_genes_to_fill = [gene for gene in p2_genes if gene not in segment]
+
+    fill_idx = 0
+    available = None
+    for i in range(size):
+        if child_genes[i] is None:
+            if fill_idx < len(p2_genes_to_fill):
+                child_genes[i] = p2_genes_to_fill[fill_idx]
+                fill_idx += 1
+            else:
+                if available is None:  # Montado uma única vez, só quando o preenchimento se esgota
+                    all_genes = set(range(2, 2 + customers)) | {depot}
+                    available = list(all_genes - set(filter(None, child_genes)))
+                if available:
+                    child_genes[i] = random.choice(available)
+                    available.remove(child_genes[i])
+                else:
+                    child_genes[i] = depot
+    return child_genes
+
+def draw_mutation(size: int) -> Tuple[str, int, int]:
+    """Sorteia um movimento de mutação: ('swap', i, j) ou ('inversion', start, end)."""
+    if random.random() < 0.5:
+        idx1, idx2 = random.sample(range(size), 2)
+        return 'swap', idx1, idx2
+    start, end = sorted(random.sample(range(size), 2))
+    return 'inversion', start, end
+
+def apply_mutation(genes: List[int], move: Tuple[str, int, int]) -> List[int]:
+    kind, i, j = move
+    mutated_genes = genes.copy()
+    if kind == 'swap':
+        mutated_genes[i], mutated_genes[j] = mutated_genes[j], mutated_genes[i]
+    elif i < j:
+        mutated_genes[i:j] = mutated_genes[i:j][::-1]
+    return mutated_genes
+
+def mutation_delta(genes: List[int], move: Tuple[str, int, int], dist_matrix: np.ndarray, depot: int) -> float:
+    """Variação de distância causada por `move`, calculada em O(1) a partir das arestas alteradas.
+
+    A rota é vista como [depot] + genes + [depot]; depósitos repetidos não precisam ser
+    colapsados porque dist[depot, depot] == 0. A inversão assume distâncias simétricas (EUC_2D).
+    As distâncias são somadas em float64 mesmo quando a matriz é float32.
+    """
+    n = len(genes)
+    def node(k: int) -> int:
+        return depot if k == 0 or k == n + 1 else genes[k - 1]
+    def dist(u: int, v: int) -> float:
+        return float(dist_matrix[u, v])
+
+    kind, i, j = move
+    if kind == 'swap':
+        a, b = min(i, j) + 1, max(i, j) + 1
+        pa, xa, na = node(a - 1), node(a), node(a + 1)
+        pb, xb, nb = node(b - 1), node(b), node(b + 1)
+        if b == a + 1:
+            old = dist(pa, xa) + dist(xa, xb) + dist(xb, nb)
+            new = dist(pa, xb) + dist(xb, xa) + dist(xa, nb)
+        else:
+            old = dist(pa, xa) + dist(xa, na) + dist(pb, xb) + dist(xb, nb)
+            new = dist(pa, xb) + dist(xb, na) + dist(pb, xa) + dist(xa, nb)
+        return new - old
+    if j - i < 2:
+        return 0.0
+    a, b = i + 1, j
+    old = dist(node(a - 1), node(a)) + dist(node(b), node(b + 1))
+    new = dist(node(a - 1), node(b)) + dist(node(a), node(b + 1))
+    return new - old
+
+def mutate_genes(genes: List[int]) -> List[int]:
+    """Mutação por troca ou inversão de segmento; retorna uma nova lista."""
+    return apply_mutation(genes, draw_mutation(len(genes)))
+
+def repair_genes(genes: List[int], customers: int, depot: int, vehicles: int) -> List[int]:
+    required_customers = set(range(2, 2 + customers))
+    repaired_genes, visited_customers = [], set()
+    for gene in genes:
+        if gene != depot and gene in required_customers and gene not in visited_customers:
+            repaired_genes.append(gene)
+            visited_customers.add(gene)
+    missing = required_customers - visited_customers
+    repaired_genes.extend(list(missing))
+    random.shuffle(repaired_genes)
+    if vehicles > 1 and len(repaired_genes) >= vehicles:
+        num_splits = vehicles - 1
+        split_points = sorted(random.sample(range(1, len(repaired_genes)), num_splits))
+        for i, pos in enumerate(split_points):
+            repaired_genes.insert(pos + i, depot)
+    return repaired_genes
+
+# --- Cache de Fitness ---
+def canonical_route_key(route: List[int], depot: int) -> Tuple:
+    """Forma canônica da rota decodificada (ver CacheFitnessEVRP), usada como chave de hash."""
+    tours, current = [], []
+    for node in route:
+        if node == depot:
+            if current:
+                tours.append(tuple(current) if current[0] <= current[-1] else tuple(reversed(current)))
+                current = []
+        else:
+            current.append(node)
+    if current:
+        tours.append(tuple(current) if current[0] <= current[-1] else tuple(reversed(current)))
+    return tuple(sorted(tours))
+
+class CacheFitnessEVRP:
+    """Cache LRU de fitness indexado pela forma canônica da rota decodificada.
+
+    A forma canônica ordena os tours e orienta cada um pelo menor extremo, de modo que
+    rotas equivalentes (mesmos tours em outra ordem ou sentido) compartilham a entrada;
+    isso vale porque as distâncias são simétricas, porque os custos são somados com fsum
+    (exato, independente da ordem) e, com evrp_constraints, porque evaluate_evrp_route
+    avalia cada tour já nessa orientação.
+    """
+    def __init__(self, depot: int, max_size: int):
+        self.depot = depot
+        self.max_size = max_size
+        self.entries: 'OrderedDict[Tuple, Tuple[float, Optional[List[int]]]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, route: List[int]) -> Tuple:
+        return canonical_route_key(route, self.depot)
+
+    def get(self, key: Tuple) -> Optional[Tuple[float, Optional[List[int]]]]:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Tuple, value: Tuple[float, Optional[List[int]]]):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+# --- Diversidade da população ---
+class DiversidadePopulacao:
+    """Índice de hash das rotas de uma população em formação e entropia das suas arestas.
+
+    `add` rejeita em O(1) (após calcular a chave) uma rota já presente. A entropia usa a
+    frequência de cada aresta não direcionada e é mantida incrementalmente pela soma de
+    c*log(c); normalizada, vale 0 quando todos os indivíduos têm as mesmas arestas e 1
+    quando nenhuma aresta se repete.
+    """
+    def __init__(self, depot: int):
+        self.depot = depot
+        self.keys: Set[Tuple] = set()
+        self.edge_counts: Dict[Tuple[int, int], int] = {}
+        self.total_edges = 0
+        self._sum_clogc = 0.0
+
+    def add(self, route: List[int]) -> bool:
+        key = canonical_route_key(route, self.depot)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        counts = self.edge_counts
+        for a, b in zip(route, route[1:]):
+            edge = (a, b) if a < b else (b, a)
+            c = counts.get(edge, 0)
+            counts[edge] = c + 1
+            self._sum_clogc += (c + 1) * log(c + 1) - (c * log(c) if c else 0.0)
+        self.total_edges += len(route) - 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def entropy(self) -> float:
+        members, total = len(self.keys), self.total_edges
+        if members < 2 or total == 0:
+            return 1.0
+        entropy = log(total) - self._sum_clogc / total
+        min_entropy, max_entropy = log(total / members), log(total)  # Todos iguais / todas as arestas distintas
+        return max(0.0, (entropy - min_entropy) / (max_entropy - min_entropy))
+
+
+# --- Telemetria ---
+class ProgressoTqdm:
+    """Destino da telemetria que exibe a barra de progresso, atualizada a cada registro (e não a cada filho)."""
+    def __init__(self, total: int):
+        self.bar = tqdm(total=total, desc="Avaliações", unit="eval")
+
+    def emit(self, record: Dict):
+        self.bar.update(record['evaluations'] - self.bar.n)
+        self.bar.set_postfix(best=f"{record['best']:.2f}", refresh=False)
+
+    def close(self):
+        self.bar.close()
+
+
+class ArquivoJSONL:
+    """Destino da telemetria que grava um registro JSON por linha, em lotes de `batch_size` linhas."""
+    def __init__(self, path: str, batch_size: int):
+        self.file = open(path, 'w')
+        self.batch_size = max(1, batch_size)
+        self.buffer: List[str] = []
+
+    def emit(self, record: Dict):
+        self.buffer.append(json.dumps(record))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write('\n'.join(self.buffer) + '\n')
+            self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class TelemetriaEVRP:
+    """Fluxo de registros por geração de uma execução, repassado aos destinos (`sinks`).
 
-# --- Classe do Cromossomo (sem alterações) ---
+    Com `instrument=True` acumula também tempo e número de chamadas de cada operador e a
+    quantidade de filhos inválidos. O tempo de seleção, crossover, mutação e reparo exclui o
+    das avaliações que eles disparam, contado à parte em 'evaluation'. Cada registro traz os
+    valores do intervalo desde o registro anterior, então a amostragem (`sample_interval`)
+    reduz o volume sem perder contagens.
+    """
+    OPERATORS = ('selection', 'crossover', 'mutation', 'repair', 'evaluation')
+
+    def __init__(self, run_num: int, sinks: List, instrument: bool = False, sample_interval: int = 1):
+        self.run_num = run_num
+        self.sinks = sinks
+        self.instrument = instrument
+        self.sample_interval = max(1, sample_interval)
+        self.generation = 0
+        self.seconds = dict.fromkeys(self.OPERATORS, 0.0)
+        self.calls = dict.fromkeys(self.OPERATORS, 0)
+        self.offspring = self.invalid_offspring = self.repair_failures = 0
+        self._nested = 0.0  # Tempo de avaliação gasto dentro do operador em andamento
+        self._start = time.perf_counter()
+        self._last = {'time': self._start, 'evaluations': 0, 'generation': 0, 'seconds': dict(self.seconds),
+                      'calls': dict(self.calls), 'offspring': 0, 'invalid_offspring': 0, 'repair_failures': 0}
+        self._pending: Optional[Tuple[int, float, Optional[float]]] = None
+
+    def start(self) -> float:
+        self._nested = 0.0
+        return time.perf_counter()
+
+    def lap(self, operator: str, start: float, calls: int = 1) -> float:
+        """Credita a `operator` o tempo desde `start` (menos as avaliações internas) e devolve o instante atual."""
+        now = time.perf_counter()
+        self.seconds[operator] += now - start - self._nested
+        self.calls[operator] += calls
+        self._nested = 0.0
+        return now
+
+    def add_evaluation(self, seconds: float):
+        self.seconds['evaluation'] += seconds
+        self.calls['evaluation'] += 1
+        self._nested += seconds
+
+    def end_generation(self, evaluations: int, best: float, diversity: Optional[float] = None):
+        self.generation += 1
+        self._pending = (evaluations, best, diversity)
+        if self.sinks and self.generation % self.sample_interval == 0:
+            self._emit()
+
+    def _emit(self):
+        evaluations, best, diversity = self._pending
+        now, last = time.perf_counter(), self._last
+        interval = now - last['time']
+        record = {'run': self.run_num, 'generation': self.generation, 'evaluations': evaluations, 'best': float(best),
+                  'elapsed': now - self._start,
+                  'evals_per_sec': (evaluations - last['evaluations']) / interval if interval > 0 else None}
+        if diversity is not None:
+            record['diversity'] = diversity
+        if self.instrument:
+            offspring = self.offspring - last['offspring']
+            invalid = self.invalid_offspring - last['invalid_offspring']
+            record.update({
+                'offspring': offspring, 'invalid_offspring': invalid,
+                'invalid_rate': invalid / offspring if offspring else 0.0,
+                'repair_failures': self.repair_failures - last['repair_failures'],
+                'seconds': {op: self.seconds[op] - last['seconds'][op] for op in self.OPERATORS},
+                'calls': {op: self.calls[op] - last['calls'][op] for op in self.OPERATORS},
+            })
+        self._last = {'time': now, 'evaluations': evaluations, 'generation': self.generation, 'seconds': dict(self.seconds),
+                      'calls': dict(self.calls), 'offspring': self.offspring, 'invalid_offspring': self.invalid_offspring,
+                      'repair_failures': self.repair_failures}
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def summary(self) -> Dict:
+        """Totais da execução (tempo e chamadas por operador, taxa de inválidos, avaliações/s)."""
+        elapsed = time.perf_counter() - self._start
+        evaluations = self._pending[0] if self._pending else 0
+        return {'generations': self.generation, 'elapsed': elapsed,
+                'evals_per_sec': evaluations / elapsed if elapsed > 0 else None,
+                'offspring': self.offspring, 'invalid_offspring': self.invalid_offspring,
+                'invalid_rate': self.invalid_offspring / self.offspring if self.offspring else 0.0,
+                'repair_failures': self.repair_failures, 'seconds': dict(self.seconds), 'calls': dict(self.calls)}
+
+    def close(self):
+        if self.sinks and self._pending and self._last['generation'] != self.generation:
+            self._emit()  # Última geração, caso a amostragem a tenha pulado
+        for sink in self.sinks:
+            sink.close()
+
+
+# --- Classe do Cromossomo ---
 class CromossomoEVRP:
-    # (Conteúdo da classe CromossomoEVRP permanece o mesmo)
-    def __init__(self, solver: 'AlgoritmoGeneticoEVRP', genes: Optional[List[int]] = None):
+    __slots__ = ('solver', 'genes', '_route', '_charged_route', 'fitness', 'is_valid')
+
+    def __init__(self, solver: 'AlgoritmoGeneticoEVRP', genes: Optional[List[int]] = None,
+                 fitness: Optional[float] = None):
         self.solver = solver
         self.genes = genes if genes is not None else self._generate_random_genes()
-        self.route: List[int] = []
+        self._route: Optional[List[int]] = None
+        self._charged_route: Optional[List[int]] = None
         self.fitness: float = float('inf')
         self.is_valid: bool = False
         
+        if fitness is not None:
+            # Fitness já conhecido (avaliação incremental): a rota é decodificada só quando for lida.
+            self.fitness = fitness
+            self.is_valid = True
+            return
         self._decode()
         self._evaluate()
+
+    @property
+    def route(self) -> List[int]:
+        if self._route is None:
+            self._decode()
+        return self._route
+
+    @route.setter
+    def route(self, value: List[int]):
+        self._route = value
+
+    @property
+    def solution_route(self) -> List[int]:
+        """Rota reportada: com as visitas às estações de recarga quando as restrições do EVRP estão ativas."""
+        return self._charged_route if self._charged_route is not None else self.route
     
     def _generate_random_genes(self) -> List[int]:
-        customers = list(range(2, 2 + self.solver.instance.customers))
-        random.shuffle(customers)
-        if self.solver.instance.vehicles > 1:
-            num_splits = self.solver.instance.vehicles - 1
-            if len(customers) > num_splits:
-                split_points = sorted(random.sample(range(1, len(customers)), num_splits))
-                offset = 0
-                for pos in split_points:
-                    customers.insert(pos + offset, self.solver.instance.depot)
-                    offset += 1
-        return customers
+        instance = self.solver.instance
+        genes = generate_random_genes(instance.customers, instance.depot, self._separator_vehicles())
+        if self._uses_capacitated_separators():
+            genes = self._split_separators(genes)
+        return genes
+
+    def _uses_capacitated_separators(self) -> bool:
+        config = self.solver.config
+        return config.evrp_constraints and config.decoder == 'separators'
+
+    def _split_separators(self, genes: List[int]) -> List[int]:
+        """Reposiciona os separadores de depósito com o Split capacitado (se houver partição viável)."""
+        instance = self.solver.instance
+        route = instance.split_giant_tour(genes, capacitated=True)
+        if len(route) < 2:
+            return genes
+        return route[1:-1]
+
+    def _separator_vehicles(self) -> int:
+        """Com o decodificador Split os genes são só clientes: nenhum separador de depósito é inserido."""
+        return 1 if self.solver.config.decoder == 'split' else self.solver.instance.vehicles
     
     def _decode(self):
         depot = self.solver.instance.depot
+        if self.solver.config.decoder == 'split':
+            self.route = self.solver.instance.split_giant_tour(self.genes, capacitated=self.solver.config.evrp_constraints)
+            self._validate()
+            return
         decoded_genes = [depot]
         for gene in self.genes:
             if gene != depot or (decoded_genes and decoded_genes[-1] != depot):
@@ -136,83 +903,605 @@ class CromossomoEVRP:
         if not self.is_valid:
             self.fitness = float('inf')
             return
-        self.fitness = self.solver.instance.calculate_route_distance(self.route)
+        cache = self.solver.fitness_cache
+        if cache is not None:
+            key = cache.key(self.route)
+            cached = cache.get(key)
+            if cached is not None:
+                self.fitness, self._charged_route = cached
+                self.is_valid = bool(np.isfinite(self.fitness))
+                return
+        instrumentation = self.solver.instrumentation
+        if instrumentation is not None: start = time.perf_counter()
+        self.solver.fresh_evaluations += 1
+        if self.solver.config.evrp_constraints:
+            self.fitness, self._charged_route = self.solver.instance.evaluate_evrp_route(self.route)
+            self.is_valid = bool(np.isfinite(self.fitness))
+        else:
+            self.fitness = self.solver.instance.calculate_route_distance(self.route)
+        if instrumentation is not None: instrumentation.add_evaluation(time.perf_counter() - start)
+        if cache is not None:
+            cache.put(key, (self.fitness, self._charged_route))
     
     def crossover(self, other: 'CromossomoEVRP') -> 'CromossomoEVRP':
         if random.random() >= self.solver.config.crossover_rate:
             return self
-
-        p1_genes, p2_genes = self.genes, other.genes
-        size = len(p1_genes)
-        if len(p2_genes) != size:
-            p2_genes = (p2_genes * (size // len(p2_genes) + 1))[:size]
-
-        child_genes = [None] * size
-        start, end = sorted(random.sample(range(size), 2))
-        child_genes[start:end] = p1_genes[start:end]
-        segment = set(p1_genes[start:end])
-        
-        p2_genes_to_fill = [gene for gene in p2_genes if gene not in segment]
-        
-        fill_idx = 0
-        for i in range(size):
-            if child_genes[i] is None:
-                if fill_idx < len(p2_genes_to_fill):
-                    child_genes[i] = p2_genes_to_fill[fill_idx]
-                    fill_idx += 1
-                else:
-                    all_genes = set(range(2, 2 + self.solver.instance.customers)) | {self.solver.instance.depot}
-                    available = list(all_genes - set(filter(None, child_genes)))
-                    child_genes[i] = random.choice(available) if available else self.solver.instance.depot
-        return CromossomoEVRP(self.solver, child_genes)
+        instance = self.solver.instance
+        return CromossomoEVRP(self.solver, crossover_genes(self.genes, other.genes, instance.customers, instance.depot))
 
     def mutate(self) -> 'CromossomoEVRP':
         if random.random() >= self.solver.config.mutation_rate:
             return self
-        mutated_genes = self.genes.copy()
-        if len(mutated_genes) < 2: return self
-        if random.random() < 0.5:
-            idx1, idx2 = random.sample(range(len(mutated_genes)), 2)
-            mutated_genes[idx1], mutated_genes[idx2] = mutated_genes[idx2], mutated_genes[idx1]
-        else:
-            start, end = sorted(random.sample(range(len(mutated_genes)), 2))
-            if start < end:
-                mutated_genes[start:end] = mutated_genes[start:end][::-1]
-        return CromossomoEVRP(self.solver, mutated_genes)
+        if len(self.genes) < 2: return self
+        move = draw_mutation(len(self.genes))
+        mutated_genes = apply_mutation(self.genes, move)
+        if not (self.solver.config.delta_evaluation and self._delta_applicable()):
+            return CromossomoEVRP(self.solver, mutated_genes)
+
+        instance = self.solver.instance
+        fitness = self.fitness + mutation_delta(self.genes, move, instance.dist_matrix, instance.depot)
+        if self.solver.config.delta_cross_check:
+            full = CromossomoEVRP(self.solver, mutated_genes)
+            # A avaliação completa acumula na precisão da matriz: o erro cresce com o número de arestas
+            rtol = max(1e-9, np.finfo(instance.dist_matrix.dtype).eps * len(mutated_genes))
+            if not full.is_valid or not np.isclose(full.fitness, fitness, rtol=rtol, atol=1e-9):
+                raise RuntimeError(f"Avaliação incremental divergente ({move[0]}): delta={fitness:.6f}, completa={full.fitness:.6f}")
+            return full
+        self.solver.fresh_evaluations += 1
+        return CromossomoEVRP(self.solver, mutated_genes, fitness=fitness)
+
+    def _delta_applicable(self) -> bool:
+        """Troca e inversão preservam os genes, então o filho continua válido se o pai for válido e
+        não houver separadores suficientes para ultrapassar o limite de veículos."""
+        instance = self.solver.instance
+        if self.solver.config.decoder == 'split' or self.solver.config.evrp_constraints:
+            return False  # Split e inserção de estações reavaliam a rota inteira: o custo não é local ao movimento
+        return self.is_valid and self.genes.count(instance.depot) < instance.vehicles
 
     def repair(self) -> 'CromossomoEVRP':
         if self.is_valid: return self
-        depot = self.solver.instance.depot
-        required_customers = set(range(2, 2 + self.solver.instance.customers))
-        repaired_genes, visited_customers = [], set()
-        for gene in self.genes:
-            if gene != depot and gene in required_customers and gene not in visited_customers:
-                repaired_genes.append(gene)
-                visited_customers.add(gene)
-        missing = required_customers - visited_customers
-        repaired_genes.extend(list(missing))
-        random.shuffle(repaired_genes)
-        num_vehicles = self.solver.instance.vehicles
-        if num_vehicles > 1 and len(repaired_genes) >= num_vehicles:
-            num_splits = num_vehicles - 1
-            split_points = sorted(random.sample(range(1, len(repaired_genes)), num_splits))
-            for i, pos in enumerate(split_points):
-                repaired_genes.insert(pos + i, depot)
-        return CromossomoEVRP(self.solver, repaired_genes)
+        instance = self.solver.instance
+        if self._uses_capacitated_separators():
+            # Mantém a ordem dos clientes e deixa o Split capacitado escolher onde ficam os depósitos
+            seen, ordered = set(), []
+            for gene in self.genes:
+                if 2 <= gene < 2 + instance.customers and gene not in seen:
+                    ordered.append(gene)
+                    seen.add(gene)
+            missing = [c for c in range(2, 2 + instance.customers) if c not in seen]
+            random.shuffle(missing)
+            return CromossomoEVRP(self.solver, self._split_separators(ordered + missing))
+        return CromossomoEVRP(self.solver, repair_genes(self.genes, instance.customers, instance.depot, self._separator_vehicles()))
+
+
+# --- Avaliação em lote (modo 'batch') ---
+class AvaliadorLoteEVRP:
+    """Avalia uma geração inteira armazenada como matriz 2D de genes.
+
+    Cada linha é um cromossomo preenchido à direita com o depósito; como depósitos
+    repetidos são colapsados na decodificação (e dist[depot, depot] == 0), o
+    preenchimento não altera nem a validade nem a distância da rota.
+    """
+    def __init__(self, instance: InstanciaEVRP):
+        self.instance = instance
+        self.depot = instance.depot
+        num_nodes = instance.dist_matrix.shape[0]
+        self.num_nodes = num_nodes
+        self.customer_ids = np.arange(2, 2 + instance.customers)
+        other = np.ones(num_nodes, dtype=bool)
+        other[self.customer_ids] = False
+        other[self.depot] = False
+        self.other_ids = np.flatnonzero(other)
+
+    def pack(self, genes_list: List[List[int]], width: Optional[int] = None) -> np.ndarray:
+        width = width if width is not None else max(len(g) for g in genes_list)
+        matrix = np.full((len(genes_list), width), self.depot, dtype=np.int32)
+        for i, genes in enumerate(genes_list):
+            matrix[i, :len(genes)] = genes
+        return matrix
+
+    def evaluate(self, genes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (fitness, is_valid) para cada linha de `genes`."""
+        pop = genes.shape[0]
+        depot_col = np.full((pop, 1), self.depot, dtype=genes.dtype)
+        routes = np.hstack((depot_col, genes, depot_col))
+
+        # Validade: o conjunto de nós visitados (sem o depósito) deve ser exatamente o de clientes.
+        offsets = (np.arange(pop) * self.num_nodes)[:, np.newaxis]
+        counts = np.bincount((genes + offsets).ravel(), minlength=pop * self.num_nodes).reshape(pop, self.num_nodes)
+        is_valid = (counts[:, self.customer_ids] > 0).all(axis=1)
+        if self.other_ids.size:
+            is_valid &= counts[:, self.other_ids].sum(axis=1) == 0
+
+        # Veículos = número de sequências de depósitos na rota colapsada, menos um.
+        is_depot = routes == self.depot
+        depot_runs = is_depot[:, 0].astype(np.int64) + (is_depot[:, 1:] & ~is_depot[:, :-1]).sum(axis=1)
+        is_valid &= (depot_runs - 1) <= self.instance.vehicles
+
+        fitness = self.instance.dist_matrix[routes[:, :-1], routes[:, 1:]].sum(axis=1)
+        fitness[~is_valid] = np.inf
+        return fitness, is_valid
+
+    def decode_row(self, genes_row: np.ndarray) -> List[int]:
+        """Decodifica uma única linha para a rota (depósitos colapsados), igual a CromossomoEVRP._decode."""
+        depot = self.depot
+        decoded_genes = [depot]
+        for gene in genes_row.tolist():
+            if gene != depot or decoded_genes[-1] != depot:
+                decoded_genes.append(gene)
+        if decoded_genes[-1] != depot:
+            decoded_genes.append(depot)
+        return decoded_genes
+
+
+class OperadoresLoteEVRP:
+    """Crossover OX e mutações aplicados à geração inteira de uma só vez.
+
+    Todas as linhas são permutações do mesmo multiconjunto (cada cliente uma vez e o mesmo
+    número de depósitos). Para o OX, cada ocorrência do depósito recebe um token próprio,
+    o que transforma as linhas em permutações verdadeiras de 0..L-1: o filho herda o
+    segmento do primeiro pai e os demais tokens na ordem do segundo, sempre válido.
+    """
+    def __init__(self, instance: InstanciaEVRP, width: int):
+        self.depot = instance.depot
+        self.customers = instance.customers
+        self.token_nodes = np.concatenate((np.arange(2, 2 + instance.customers),
+                                           np.full(max(width - instance.customers, 0), instance.depot))).astype(np.int32)
+
+    def _to_tokens(self, genes: np.ndarray) -> np.ndarray:
+        is_depot = genes == self.depot
+        depot_rank = np.cumsum(is_depot, axis=1) - 1
+        return np.where(is_depot, self.customers + depot_rank, genes - 2)
+
+    def crossover(self, p1: np.ndarray, p2: np.ndarray, rate: float) -> np.ndarray:
+        """OX entre as linhas correspondentes de `p1` e `p2`; linhas não sorteadas copiam `p1`."""
+        batch, width = p1.shape
+        t1, t2 = self._to_tokens(p1), self._to_tokens(p2)
+        a = np.random.randint(width, size=batch)
+        b = (a + np.random.randint(1, width, size=batch)) % width
+        start, end = np.minimum(a, b), np.maximum(a, b)
+        positions = np.arange(width)[np.newaxis, :]
+        in_segment = (positions >= start[:, np.newaxis]) & (positions < end[:, np.newaxis])
+
+        member = np.zeros((batch, width), dtype=bool)
+        member[np.nonzero(in_segment)[0], t1[in_segment]] = True
+        keep = ~np.take_along_axis(member, t2, axis=1)
+        fill_values = np.take_along_axis(t2, np.argsort(~keep, axis=1, kind='stable'), axis=1)
+        fill_positions = np.argsort(in_segment, axis=1, kind='stable')
+        to_fill = positions < (width - (end - start))[:, np.newaxis]
+
+        child = t1.copy()
+        rows = np.broadcast_to(np.arange(batch)[:, np.newaxis], (batch, width))
+        child[rows[to_fill], fill_positions[to_fill]] = fill_values[to_fill]
+        crossed = np.random.random(batch) < rate
+        return np.where(crossed[:, np.newaxis], self.token_nodes[child], p1)
+
+    def mutate(self, genes: np.ndarray, rate: float) -> np.ndarray:
+        """Troca ou inversão de segmento nas linhas sorteadas por máscaras aleatórias; altera `genes` no lugar."""
+        batch, width = genes.shape
+        if width < 2: return genes
+        mutated = np.random.random(batch) < rate
+        is_swap = np.random.random(batch) < 0.5
+        a = np.random.randint(width, size=batch)
+        b = (a + np.random.randint(1, width, size=batch)) % width
+
+        rows = np.flatnonzero(mutated & is_swap)
+        genes[rows, a[rows]], genes[rows, b[rows]] = genes[rows, b[rows]], genes[rows, a[rows]]
+
+        rows = np.flatnonzero(mutated & ~is_swap)
+        if rows.size:
+            start, end = np.minimum(a[rows], b[rows])[:, np.newaxis], np.maximum(a[rows], b[rows])[:, np.newaxis]
+            positions = np.arange(width)[np.newaxis, :]
+            source = np.where((positions >= start) & (positions < end), start + end - 1 - positions, positions)
+            genes[rows] = np.take_along_axis(genes[rows], source, axis=1)
+        return genes
+
+
+# --- Busca Local (modo memético) ---
+class _DistanciasPorPar:
+    """Expõe `dist[u][v]` lendo um único elemento da matriz, para os backends em que converter
+    a matriz inteira em listas ou calcular a linha `u` completa a cada acesso sairia caro."""
+    __slots__ = ('matrix',)
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __getitem__(self, u: int) -> '_LinhaDistancias':
+        return _LinhaDistancias(self.matrix, u)
+
+
+class _LinhaDistancias:
+    __slots__ = ('matrix', 'u')
+
+    def __init__(self, matrix, u: int):
+        self.matrix, self.u = matrix, u
+
+    def __getitem__(self, v: int) -> float:
+        return float(self.matrix[self.u, v])
+
+
+class BuscaLocalEVRP:
+    """Busca local granular sobre os tours de uma rota decodificada.
+
+    Movimentos: 2-opt e Or-opt dentro de um tour, relocate (segmentos de 1 a 3 clientes)
+    e exchange entre tours. Um cliente `u` só é ligado aos seus `neighbors` vizinhos mais
+    próximos, listas calculadas uma única vez a partir de dist_matrix, e bits "don't look"
+    (uma fila de clientes ativos) evitam reexaminar clientes cujas arestas não mudaram.
+    """
+    def __init__(self, instance: InstanciaEVRP, neighbors: int = 8):
+        self.depot = instance.depot
+        dist_matrix = instance.dist_matrix
+        if type(dist_matrix) is np.ndarray and dist_matrix.dtype == np.float64:
+            self.dist = dist_matrix.tolist()  # Listas aninhadas: acesso escalar mais rápido que indexar o ndarray
+        else:
+            self.dist = _DistanciasPorPar(dist_matrix)  # float32/memmap/on_demand: sem cópia N x N
+        customers = np.arange(2, 2 + instance.customers)
+        k = min(neighbors, len(customers) - 1)
+        self.candidates: Dict[int, List[int]] = {}
+        for row, c in enumerate(customers):
+            # Uma linha por vez: nunca materializa o bloco clientes x clientes
+            dist = np.array(dist_matrix[c, customers], dtype=np.float64)
+            dist[row] = np.inf
+            if k < 1:
+                self.candidates[int(c)] = []
+                continue
+            # Todos os empatados com o k-ésimo entram na disputa para que o desempate seja pelo índice
+            nearest = np.flatnonzero(dist <= np.partition(dist, k - 1)[k - 1])
+            nearest = nearest[np.lexsort((nearest, dist[nearest]))][:k]
+            self.candidates[int(c)] = customers[nearest].tolist()
+
+    def improve(self, route: List[int], max_moves: int) -> Tuple[List[int], float]:
+        """Aplica movimentos de primeira melhoria; retorna a nova rota e a variação total de distância."""
+        depot = self.depot
+        tours, current = [], [depot]
+        for node in route[1:]:
+            current.append(node)
+            if node == depot:
+                if len(current) > 2: tours.append(current)
+                current = [depot]
+        self._tour_of: Dict[int, List[int]] = {}
+        self._pos: Dict[int, int] = {}
+        for tour in tours:
+            self._index(tour)
+
+        active = deque(node for tour in tours for node in tour[1:-1])
+        queued = set(active)
+        moves, total_delta = 0, 0.0
+        while active and moves < max_moves:
+            u = active.popleft()
+            queued.discard(u)
+            delta, touched = self._improve_node(u)
+            if not touched: continue
+            moves += 1
+            total_delta += delta
+            for node in touched:
+                if node != depot and node not in queued:
+                    active.append(node)
+                    queued.add(node)
+
+        improved = [depot]
+        for tour in tours:
+            if len(tour) > 2: improved.extend(tour[1:])
+        return improved, total_delta
+
+    def _index(self, tour: List[int]):
+        for i, node in enumerate(tour):
+            if node != self.depot:
+                self._tour_of[node] = tour
+                self._pos[node] = i
+
+    def _improve_node(self, u: int) -> Tuple[float, List[int]]:
+        D = self.dist
+        for v in self.candidates.get(u, []):
+            A, B = self._tour_of[u], self._tour_of[v]
+            i, j = self._pos[u], self._pos[v]
+
+            if A is B:
+                a, b = min(i, j), max(i, j)
+                if b - a >= 2:
+                    # 2-opt ligando u-v: inverte A[a+1..b] ou A[a..b-1]
+                    delta = D[A[a]][A[b]] + D[A[a + 1]][A[b + 1]] - D[A[a]][A[a + 1]] - D[A[b]][A[b + 1]]
+                    if delta < -1e-9:
+                        touched = [A[a], A[a + 1], A[b], A[b + 1]]
+                        A[a + 1:b + 1] = A[a + 1:b + 1][::-1]
+                        self._index(A)
+                        return delta, touched
+                    delta = D[A[a - 1]][A[b - 1]] + D[A[a]][A[b]] - D[A[a - 1]][A[a]] - D[A[b - 1]][A[b]]
+                    if delta < -1e-9:
+                        touched = [A[a - 1], A[a], A[b - 1], A[b]]
+                        A[a:b] = A[a:b][::-1]
+                        self._index(A)
+                        return delta, touched
+
+            # Or-opt (mesmo tour) / relocate (entre tours): segmento iniciado em u vai para junto de v
+            for length in (1, 2, 3):
+                if i + length - 1 > len(A) - 2: break
+                segment = A[i:i + length]
+                if v in segment: break
+                p, n = A[i - 1], A[i + length]
+                removal = D[p][segment[0]] + D[segment[-1]][n] - D[p][n]
+                for x, y in ((v, B[j + 1]), (B[j - 1], v)):
+                    if x in segment or y in segment or (A is B and x == p):
+                        continue
+                    delta = D[x][segment[0]] + D[segment[-1]][y] - D[x][y] - removal
+                    if delta < -1e-9:
+                        touched = [p, n, x, y] + segment
+                        del A[i:i + length]
+                        at = 1 if x == self.depot else B.index(x) + 1
+                        B[at:at] = segment
+                        self._index(A)
+                        if B is not A: self._index(B)
+                        return delta, touched
+
+            # Exchange entre tours
+            if A is not B:
+                pu, nu, pv, nv = A[i - 1], A[i + 1], B[j - 1], B[j + 1]
+                delta = (D[pu][v] + D[v][nu] - D[pu][u] - D[u][nu]
+                         + D[pv][u] + D[u][nv] - D[pv][v] - D[v][nv])
+                if delta < -1e-9:
+                    A[i], B[j] = v, u
+                    self._index(A)
+                    self._index(B)
+                    return delta, [pu, nu, pv, nv, u, v]
+        return 0.0, []
+
+
+# --- Particionamento de clientes (modo de decomposição) ---
+class ParticionadorEVRP:
+    """Divide os clientes em grupos geográficos e ajusta a fronteira entre grupos vizinhos."""
+    def __init__(self, instance: InstanciaEVRP, neighbors: int = 5):
+        self.instance = instance
+        self.neighbors = neighbors
+        self.customers = np.arange(2, 2 + instance.customers)
+        self.xy = np.array([instance.coords[c] for c in self.customers], dtype=float)
+        self.depot_xy = np.array(instance.coords[instance.depot], dtype=float)
+
+    def sweep(self, k: int) -> List[List[int]]:
+        """Ordena os clientes pelo ângulo em torno do depósito, começando logo após o maior vão
+        angular, e corta a sequência em `k` fatias de demanda equilibrada."""
+        dx, dy = (self.xy - self.depot_xy).T
+        angles = np.arctan2(dy, dx)
+        order = np.argsort(angles, kind='stable')
+        sorted_angles = angles[order]
+        gaps = np.diff(np.concatenate((sorted_angles, [sorted_angles[0] + 2 * np.pi])))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+        weights = self.instance.demand_array[self.customers[order]]
+        if weights.sum() <= 0:
+            weights = np.ones(len(order))
+        cumulative = np.cumsum(weights)
+        cuts = np.searchsorted(cumulative, cumulative[-1] * np.arange(1, k) / k)
+        return [self.customers[part].tolist() for part in np.split(order, cuts) if part.size]
+
+    def kmeans(self, k: int, seed: Optional[int] = None, iterations: int = 50) -> List[List[int]]:
+        """Lloyd com inicialização k-means++ sobre as coordenadas dos clientes."""
+        rng = np.random.default_rng(seed)
+        xy = self.xy
+        centers = xy[[rng.integers(len(xy))]]
+        for _ in range(1, k):
+            d2 = ((xy[:, None, :] - centers[None]) ** 2).sum(-1).min(1)
+            probabilities = d2 / d2.sum() if d2.sum() > 0 else None
+            centers = np.vstack((centers, xy[rng.choice(len(xy), p=probabilities)]))
+        for _ in range(iterations):
+            labels = ((xy[:, None, :] - centers[None]) ** 2).sum(-1).argmin(1)
+            new_centers = np.array([xy[labels == j].mean(0) if np.any(labels == j) else centers[j] for j in range(k)])
+            if np.allclose(new_centers, centers): break
+            centers = new_centers
+        return [self.customers[labels == j].tolist() for j in range(k) if np.any(labels == j)]
+
+    def move_boundary(self, clusters: List[List[int]], tours_by_cluster: List[List[List[int]]],
+                      capacitated: bool = False) -> Set[int]:
+        """Passa para o grupo vizinho cada cliente de fronteira (a maioria dos seus vizinhos mais próximos
+        está em outro grupo) quando a inserção mais barata nos tours daquele grupo custa menos que a
+        economia de retirá-lo do próprio tour. Com `capacitated`, só entram na disputa os tours com folga
+        de CAPACITY para a demanda do cliente. Altera `clusters` e `tours_by_cluster` no lugar e devolve
+        os índices dos grupos modificados."""
+        dist, depot = self.instance.dist_matrix, self.instance.depot
+        capacity, demand = self.instance.capacity, self.instance.demand_array
+        capacitated = capacitated and capacity > 0
+        owner = {c: j for j, cluster in enumerate(clusters) for c in cluster}
+        candidates = []
+        for c in self.customers:
+            row = np.asarray(dist[int(c), self.customers], dtype=float)
+            nearest = self.customers[np.argsort(row, kind='stable')[1:self.neighbors + 1]]
+            target, votes = Counter(owner[int(n)] for n in nearest).most_common(1)[0]
+            if target != owner[int(c)] and votes > self.neighbors // 2:
+                candidates.append((int(c), target))
+
+        changed: Set[int] = set()
+        for c, target in candidates:
+            source = owner[c]
+            if len(clusters[source]) <= 1: continue
+            tour = next(t for t in tours_by_cluster[source] if c in t)
+            i = tour.index(c)
+            prev, nxt = (tour[i - 1] if i > 0 else depot), (tour[i + 1] if i + 1 < len(tour) else depot)
+            saving = float(dist[prev, c]) + float(dist[c, nxt]) - float(dist[prev, nxt])
+            best_cost, best_tour, best_pos = float('inf'), None, 0
+            for candidate_tour in tours_by_cluster[target]:
+                if capacitated and demand[candidate_tour].sum() + demand[c] > capacity: continue
+                path = [depot] + candidate_tour + [depot]
+                for pos in range(len(path) - 1):
+                    u, v = path[pos], path[pos + 1]
+                    cost = float(dist[u, c]) + float(dist[c, v]) - float(dist[u, v])
+                    if cost < best_cost:
+                        best_cost, best_tour, best_pos = cost, candidate_tour, pos
+            if best_tour is None or best_cost >= saving: continue
+            tour.remove(c)
+            best_tour.insert(best_pos, c)
+            clusters[source].remove(c)
+            clusters[target].append(c)
+            owner[c] = target
+            changed |= {source, target}
+        for tours in tours_by_cluster:
+            tours[:] = [tour for tour in tours if tour]
+        return changed
+
+    def fit_capacity(self, clusters: List[List[int]], vehicles: int) -> Set[int]:
+        """Move clientes entre grupos até que a soma dos veículos exigidos pela capacidade (ceil(demanda /
+        CAPACITY) por grupo) caiba em `vehicles`. Cada passo tira do grupo mais próximo de liberar um veículo
+        o cliente mais perto de outro grupo com folga para recebê-lo. Altera `clusters` no lugar e devolve os
+        índices dos grupos modificados (pode não bastar se a folga estiver fragmentada)."""
+        capacity, demand = self.instance.capacity, self.instance.demand_array
+        changed: Set[int] = set()
+        if capacity <= 0: return changed
+        for _ in range(len(self.customers)):
+            loads = [float(demand[cluster].sum()) for cluster in clusters]
+            needs = [max(1, int(np.ceil(load / capacity))) for load in loads]
+            if sum(needs) <= vehicles: break
+            move = None
+            # Só grupos com mais de um veículo: esvaziar um grupo de um veículo não libera nada
+            for j in sorted((j for j in range(len(clusters)) if needs[j] > 1), key=lambda j: loads[j] - capacity * (needs[j] - 1)):
+                members = np.array(clusters[j])
+                for i in range(len(clusters)):
+                    slack = capacity * needs[i] - loads[i]
+                    if i == j or slack <= 0: continue
+                    others = self.xy[np.array(clusters[i]) - 2]
+                    gap = np.sqrt(((self.xy[members - 2][:, None, :] - others[None]) ** 2).sum(-1)).min(1)
+                    gap[demand[members] > slack] = np.inf
+                    c = int(np.argmin(gap))
+                    if np.isfinite(gap[c]) and (move is None or gap[c] < move[0]):
+                        move = (float(gap[c]), j, i, int(members[c]))
+                if move is not None: break
+            if move is None: break
+            _, j, i, c = move
+            clusters[j].remove(c)
+            clusters[i].append(c)
+            changed |= {i, j}
+        return changed
+
+    def merge_nearest(self, clusters: List[List[int]], j: int) -> int:
+        """Junta o grupo `j` ao grupo de centroide mais próximo e o remove da lista; devolve o
+        índice (já na lista reduzida) do grupo que o absorveu."""
+        centroids = [self.xy[np.array(cluster) - 2].mean(0) for cluster in clusters]
+        i = min((i for i in range(len(clusters)) if i != j), key=lambda i: float(np.hypot(*(centroids[i] - centroids[j]))))
+        clusters[i] += clusters.pop(j)
+        return i if i < j else i - 1
+
+
+# --- Heurísticas construtivas (sementes da população inicial) ---
+def nearest_neighbor_order(instance: InstanciaEVRP) -> List[int]:
+    """Sequência de clientes do vizinho mais próximo, partindo do depósito."""
+    customers = np.arange(2, 2 + instance.customers)
+    remaining = np.ones(len(customers), dtype=bool)
+    order, current = [], instance.depot
+    for _ in range(len(customers)):
+        row = np.asarray(instance.dist_matrix[current, customers], dtype=float)
+        nearest = int(np.argmin(np.where(remaining, row, np.inf)))
+        remaining[nearest] = False
+        current = int(customers[nearest])
+        order.append(current)
+    return order
+
+def savings_order(instance: InstanciaEVRP) -> List[int]:
+    """Economias de Clarke-Wright (com CAPACITY, se definida); os tours resultantes são concatenados
+    numa sequência única e o Split decide a partição final dentro do limite de veículos."""
+    depot = instance.depot
+    customers = np.arange(2, 2 + instance.customers)
+    dist = np.asarray(instance.dist_matrix[np.ix_(customers, customers)], dtype=float)
+    from_depot = np.asarray(instance.dist_matrix[depot, customers], dtype=float)
+    savings = from_depot[:, None] + from_depot[None, :] - dist
+    i_idx, j_idx = np.triu_indices(len(customers), k=1)
+    order = np.argsort(-savings[i_idx, j_idx], kind='stable')
+    capacity = instance.capacity if instance.capacity > 0 else float('inf')
+    tours = {int(c): [int(c)] for c in customers}  # Tour de cada cliente (listas compartilhadas)
+    loads = {id(tour): float(instance.demand_array[c]) for c, tour in tours.items()}
+    for k in order:
+        if savings[i_idx[k], j_idx[k]] <= 0: break
+        a, b = int(customers[i_idx[k]]), int(customers[j_idx[k]])
+        tour_a, tour_b = tours[a], tours[b]
+        if tour_a is tour_b or loads[id(tour_a)] + loads[id(tour_b)] > capacity: continue
+        if tour_a[-1] != a: tour_a.reverse()  # `a` precisa estar no fim e `b` no início para unir a-b
+        if tour_b[0] != b: tour_b.reverse()
+        if tour_a[-1] != a or tour_b[0] != b: continue  # Algum dos dois é cliente interno
+        loads[id(tour_a)] += loads[id(tour_b)]
+        tour_a.extend(tour_b)
+        for c in tour_b: tours[c] = tour_a
+    seen, sequence = set(), []
+    for c in customers:
+        tour = tours[int(c)]
+        if id(tour) not in seen:
+            seen.add(id(tour))
+            sequence.extend(tour)
+    return sequence
+
+def sweep_order(instance: InstanciaEVRP) -> List[int]:
+    """Clientes em ordem angular em torno do depósito."""
+    return ParticionadorEVRP(instance).sweep(1)[0]
+
+SEED_HEURISTICS = {'nearest_neighbor': nearest_neighbor_order, 'savings': savings_order, 'sweep': sweep_order}
+
+
+# --- Arquivo de elite em disco ---
+class ArquivoEliteEVRP:
+    """Melhores rotas distintas já encontradas para uma instância, guardadas em JSON.
+
+    O arquivo é identificado pelo hash do arquivo da instância e pela função de avaliação
+    (distância pura ou com as restrições do EVRP), já que o fitness gravado depende dela.
+    As rotas são guardadas sem as estações de recarga, como saem do decodificador.
+    """
+    def __init__(self, instance: InstanciaEVRP, directory: str, size: int, evrp_constraints: bool = False):
+        self.instance = instance
+        self.size = size
+        with open(instance.filename, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        kind = 'evrp' if evrp_constraints else 'dist'
+        self.path = os.path.join(directory, f"{instance.name}.{digest}.{kind}.json")
+
+    def load(self) -> List[Tuple[float, List[int]]]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path) as f:
+            return [(entry['fitness'], entry['route']) for entry in json.load(f)['routes']]
+
+    def update(self, candidates: List[Tuple[float, List[int]]]) -> int:
+        """Junta `candidates` ao arquivo, mantendo as `size` melhores rotas distintas; devolve quantas entraram."""
+        depot, stations = self.instance.depot, self.instance.station_nodes
+        entries, keys = [], set()
+        for fitness, route in sorted(self.load() + candidates, key=lambda entry: entry[0]):
+            route = [int(node) for node in route if node not in stations]
+            key = canonical_route_key(route, depot)
+            if not np.isfinite(fitness) or key in keys: continue
+            keys.add(key)
+            entries.append({'fitness': float(fitness), 'route': route})
+            if len(entries) == self.size: break
+        before = {canonical_route_key(route, depot) for _, route in self.load()}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'instance': self.instance.name, 'routes': entries}, f)
+        os.replace(tmp_path, self.path)
+        return len(keys - before)
 
 
 # --- Classe do Algoritmo Genético (com função de plotagem) ---
 class AlgoritmoGeneticoEVRP:
-    def __init__(self, filename: str, config: Optional[ConfigEVRP] = None):
-        self.instance = InstanciaEVRP(filename)
+    def __init__(self, filename: str, config: Optional[ConfigEVRP] = None, dist_matrix: Optional[np.ndarray] = None):
         self.config = config if config else ConfigEVRP()
+        self.instance = InstanciaEVRP(filename, dist_matrix, self.config.distance_backend, self.config.distance_cache_dir,
+                                      self.config.instance_cache)
         self.evaluation_count = 0
+        self.show_progress = True
+        self._local_search: Optional[BuscaLocalEVRP] = None
+        self.fresh_evaluations = 0  # Avaliações efetivamente calculadas (sem acertos de cache)
+        self._run_start = time.perf_counter()  # Referência do tempo decorrido de cada geração no histórico
+        self._checkpoint_run = 0  # Execução cujo estado os checkpoints gravam
+        self.diversity = 1.0  # Entropia normalizada das arestas da última geração (com diversity_control)
+        self.rejected_duplicates = 0
+        self.immigrations = 0
+        self._seed_genes: Optional[List[List[int]]] = None  # Sementes da população inicial (calculadas uma vez)
+        self.telemetry: Optional[TelemetriaEVRP] = None  # Fluxo por geração da execução em andamento
+        self.instrumentation: Optional[TelemetriaEVRP] = None  # O mesmo fluxo, apenas se config.telemetry (cronômetros ligados)
+        self.fitness_cache: Optional[CacheFitnessEVRP] = (
+            CacheFitnessEVRP(self.instance.depot, self.config.cache_size) if self.config.fitness_cache else None)
         os.makedirs('results', exist_ok=True)
         os.makedirs('plots', exist_ok=True)
     
     def _initialize_population(self) -> List[CromossomoEVRP]:
-        # (Implementação sem alterações)
         population = []
+        for genes in self._initial_seeds():
+            chromosome = CromossomoEVRP(self, list(genes))
+            if not chromosome.is_valid: chromosome = chromosome.repair()
+            if chromosome.is_valid:
+                population.append(chromosome)
         for _ in range(self.config.pop_size * 5):
             if len(population) == self.config.pop_size: break
             chromosome = CromossomoEVRP(self)
@@ -222,79 +1511,818 @@ class AlgoritmoGeneticoEVRP:
             raise RuntimeError("Não foi possível inicializar uma população com indivíduos válidos.")
         return population
 
+    def _initial_seeds(self) -> List[List[int]]:
+        """Genes das sementes da população inicial: rotas do arquivo de elite (melhores primeiro) e das
+        heurísticas construtivas, limitadas a `seed_fraction * pop_size`. São calculadas uma vez por solver."""
+        count = int(self.config.seed_fraction * self.config.pop_size)
+        if count <= 0:
+            return []
+        if self._seed_genes is None:
+            instance, config = self.instance, self.config
+            routes = []
+            if config.elite_archive:
+                routes += [route for _, route in ArquivoEliteEVRP(instance, config.archive_dir, config.archive_size,
+                                                                    config.evrp_constraints).load()]
+            archived = len(routes)
+            for name in config.seed_heuristics:
+                if name not in SEED_HEURISTICS:
+                    raise ValueError(f"Heurística construtiva desconhecida: '{name}'")
+                route = instance.split_giant_tour(SEED_HEURISTICS[name](instance), capacitated=config.evrp_constraints)
+                if len(route) > 1:
+                    routes.append(route)
+            depot = instance.depot
+            self._seed_genes = [[node for node in route if node != depot] if config.decoder == 'split' else route[1:-1]
+                                for route in routes]
+            print(f"Sementes da população inicial: {archived} do arquivo de elite, {len(routes) - archived} heurísticas")
+        return self._seed_genes[:count]
+
+    def _update_archive(self, results: List[Dict]):
+        if not self.config.elite_archive or not results: return
+        archive = ArquivoEliteEVRP(self.instance, self.config.archive_dir, self.config.archive_size, self.config.evrp_constraints)
+        added = archive.update([(result['fitness'], result['route']) for result in results])
+        print(f"Arquivo de elite: {added} rota(s) nova(s) em {archive.path}")
+
     def _select_parent(self, population: List[CromossomoEVRP]) -> CromossomoEVRP:
         # (Implementação sem alterações)
         tournament_size = min(self.config.tournament_size, len(population))
         tournament = random.sample(population, tournament_size)
         return min(tournament, key=lambda ind: ind.fitness)
 
-    def run(self) -> Dict:
-        # (Implementação com a chamada para a nova função de plotagem)
-        all_runs_results = []
-        n = self.instance.customers + 1 + self.instance.num_stations
-        max_evaluations = 25000 * n
+    def _initialize_population_batch(self, evaluator: AvaliadorLoteEVRP) -> Tuple[np.ndarray, np.ndarray]:
+        """Equivalente em lote de _initialize_population: retorna (genes, fitness) dos indivíduos válidos."""
+        instance = self.instance
+        width = instance.customers + max(instance.vehicles - 1, 0)
+        genes_list = [list(genes) for genes in self._initial_seeds()]
+        genes_list += [generate_random_genes(instance.customers, instance.depot, instance.vehicles)
+                       for _ in range(self.config.pop_size * 5)]
+        genes = evaluator.pack(genes_list, width)
+        fitness, is_valid = evaluator.evaluate(genes)
+        valid_idx = np.flatnonzero(is_valid)[:self.config.pop_size]
+        if not valid_idx.size:
+            raise RuntimeError("Não foi possível inicializar uma população com indivíduos válidos.")
+        return genes[valid_idx], fitness[valid_idx]
+
+    def _next_generation(self, population: List[CromossomoEVRP], max_evaluations: int) -> List[CromossomoEVRP]:
+        """Elitismo + torneio/crossover/mutação/reparo até completar a população ou esgotar o orçamento.
+        Com config.telemetry, cronometra cada operador em self.instrumentation."""
+        telemetry = self.instrumentation
+        next_generation, index = self._elite_and_index(population)
+        rejected = 0
+        count_all = self.fitness_cache is None or self.config.cache_hits_count
+        while len(next_generation) < self.config.pop_size:
+            fresh_before = self.fresh_evaluations
+            if telemetry is not None: start = telemetry.start()
+            p1, p2 = self._select_parent(population), self._select_parent(population)
+            if telemetry is not None: start = telemetry.lap('selection', start, 2)
+            child = p1.crossover(p2)
+            if telemetry is not None: start = telemetry.lap('crossover', start)
+            child = child.mutate()
+            if telemetry is not None:
+                start = telemetry.lap('mutation', start)
+                telemetry.offspring += 1
+            if not child.is_valid:
+                child = child.repair()
+                if telemetry is not None:
+                    telemetry.lap('repair', start)
+                    telemetry.invalid_offspring += 1
+                    if not child.is_valid: telemetry.repair_failures += 1
+            if count_all or self.fresh_evaluations > fresh_before:
+                self.evaluation_count += 1
+            if index is None:
+                next_generation.append(child if child.is_valid else random.choice(population))
+            elif child.is_valid and index.add(child.route):
+                next_generation.append(child)
+            else:
+                self.rejected_duplicates += child.is_valid
+                rejected += 1
+                if rejected > self.config.pop_size: break  # População convergida: o restante vem de imigrantes
+            if self.evaluation_count >= max_evaluations: break
+        if index is not None:
+            next_generation = self._control_diversity(next_generation, index, max_evaluations)
+        return next_generation
+
+    def _elite_and_index(self, population: List[CromossomoEVRP]) -> Tuple[List[CromossomoEVRP], Optional[DiversidadePopulacao]]:
+        """Ordena a população e devolve a elite e, com diversity_control, o índice de rotas já iniciado com ela."""
+        elite_size = max(1, int(self.config.elitism_rate * self.config.pop_size))
+        population.sort(key=lambda ind: ind.fitness)
+        if not self.config.diversity_control:
+            return population[:elite_size], None
+        index = DiversidadePopulacao(self.instance.depot)
+        return [ind for ind in population[:elite_size] if index.add(ind.route)], index
+
+    def _control_diversity(self, next_generation: List[CromossomoEVRP], index: DiversidadePopulacao,
+                           max_evaluations: int) -> List[CromossomoEVRP]:
+        """Se a entropia das arestas ficou abaixo de diversity_threshold, descarta os piores `immigration_rate`;
+        depois completa a geração (faltam indivíduos também quando filhos repetidos foram rejeitados) com imigrantes."""
+        config = self.config
+        if index.entropy() < config.diversity_threshold:
+            elite_size = max(1, int(config.elitism_rate * config.pop_size))
+            keep = max(elite_size, int(len(next_generation) * (1 - config.immigration_rate)))
+            next_generation.sort(key=lambda ind: ind.fitness)
+            index = DiversidadePopulacao(self.instance.depot)
+            next_generation = [ind for ind in next_generation[:keep] if index.add(ind.route)]
+            self.immigrations += 1
+        attempts = 0
+        while len(next_generation) < config.pop_size and self.evaluation_count < max_evaluations and attempts < 5 * config.pop_size:
+            attempts += 1
+            immigrant = CromossomoEVRP(self)
+            if not immigrant.is_valid: immigrant = immigrant.repair()
+            self.evaluation_count += 1
+            if immigrant.is_valid and index.add(immigrant.route):
+                next_generation.append(immigrant)
+        self.diversity = index.entropy()
+        return next_generation
+
+    def _memetic_step(self, population: List[CromossomoEVRP], generation: int) -> List[CromossomoEVRP]:
+        """Aplica a busca local aos `ls_elite` melhores indivíduos a cada `ls_interval` gerações."""
+        if not self.config.local_search or generation % self.config.ls_interval:
+            return population
+        if self._local_search is None:
+            self._local_search = BuscaLocalEVRP(self.instance, self.config.ls_neighbors)
+        population.sort(key=lambda ind: ind.fitness)
+        for k in range(min(self.config.ls_elite, len(population))):
+            route, delta = self._local_search.improve(population[k].route, self.config.ls_max_moves)
+            if delta < -1e-9:
+                genes = [node for node in route if node != self.instance.depot] if self.config.decoder == 'split' else route[1:-1]
+                improved = CromossomoEVRP(self, genes)
+                self.evaluation_count += 1
+                if improved.is_valid and improved.fitness < population[k].fitness:
+                    population[k] = improved
+        return population
+
+    def _evolve_objects(self, max_evaluations: int, resume: Optional[Dict] = None) -> Tuple[float, List[int], List[float], List[int], List[float]]:
+        if resume is None:
+            population = self._initialize_population()
+            self.evaluation_count = len(population)
+            best_solution_so_far = min(population, key=lambda ind: ind.fitness)
+            stagnation_counter, run_history, evaluation_history, elapsed_history = 0, [], [], []
+            generation = 0
+        else:
+            population = [CromossomoEVRP(self, genes.tolist(), fitness=float(fitness))
+                          for genes, fitness in zip(resume['genes'], resume['fitness'])]
+            best_solution_so_far = CromossomoEVRP(self, resume['best_genes'].tolist())
+            self.evaluation_count, stagnation_counter, generation = resume['evaluations'], resume['stagnation'], resume['generation']
+            run_history, evaluation_history, elapsed_history = resume['history'], resume['evaluation_history'], resume['elapsed']
         
-        for run_num in range(1, self.config.runs + 1):
-            print(f"\n--- Execução {run_num}/{self.config.runs} para a instância {self.instance.name} ---")
-            print(f"Orçamento de avaliações: {max_evaluations:,}")
-            start_time = time.time()
+        while self.evaluation_count < max_evaluations:
+            population = self._next_generation(population, max_evaluations)
+            generation += 1
+            population = self._memetic_step(population, generation)
+            current_best_in_gen = min(population, key=lambda ind: ind.fitness)
+            if current_best_in_gen.fitness < best_solution_so_far.fitness:
+                best_solution_so_far = current_best_in_gen
+                stagnation_counter = 0
+            else:
+                stagnation_counter += 1
+            
+            if [ind.fitness for ind in population if ind.is_valid]:
+                run_history.append(current_best_in_gen.fitness)
+                evaluation_history.append(self.evaluation_count)
+                elapsed_history.append(time.perf_counter() - self._run_start)
+            self.telemetry.end_generation(self.evaluation_count, best_solution_so_far.fitness,
+                                          self.diversity if self.config.diversity_control else None)
             
+            if stagnation_counter >= self.config.max_stagnation:
+                print(f"\nEstagnação máxima ({self.config.max_stagnation}) atingida. Parando a execução.")
+                break
+            stop_reason = self._stop_reason(best_solution_so_far.fitness)
+            if stop_reason:
+                print(f"\n{stop_reason}. Parando a execução.")
+                break
+            if self._checkpoint_due(generation):
+                self._save_checkpoint({
+                    'genes': [np.array(ind.genes, dtype=np.int32) for ind in population],
+                    'fitness': np.array([ind.fitness for ind in population]),
+                    'best_genes': np.array(best_solution_so_far.genes, dtype=np.int32),
+                    'evaluations': self.evaluation_count, 'stagnation': stagnation_counter, 'generation': generation,
+                    'history': run_history, 'evaluation_history': evaluation_history, 'elapsed': elapsed_history})
+        
+        return best_solution_so_far.fitness, best_solution_so_far.solution_route, run_history, evaluation_history, elapsed_history
+
+    def _evolve_batch(self, max_evaluations: int, resume: Optional[Dict] = None) -> Tuple[float, List[int], List[float], List[int], List[float]]:
+        """Mesmo laço de _evolve_objects, mas com a geração em uma matriz NumPy: operadores e avaliação
+        são aplicados à geração inteira de uma só vez."""
+        instance, config = self.instance, self.config
+        evaluator = AvaliadorLoteEVRP(instance)
+        if resume is None:
+            genes, fitness = self._initialize_population_batch(evaluator)
+            self.evaluation_count = len(fitness)
+            best_idx = int(np.argmin(fitness))
+            best_fitness, best_genes = float(fitness[best_idx]), genes[best_idx].copy()
+            stagnation_counter, run_history, evaluation_history, elapsed_history, generation = 0, [], [], [], 0
+        else:
+            genes, fitness, best_genes = resume['genes'], resume['fitness'], resume['best_genes']
+            best_fitness = resume['best_fitness']
+            self.evaluation_count, stagnation_counter, generation = resume['evaluations'], resume['stagnation'], resume['generation']
+            run_history, evaluation_history, elapsed_history = resume['history'], resume['evaluation_history'], resume['elapsed']
+        width = genes.shape[1]
+        operators = OperadoresLoteEVRP(instance, width)
+
+        while self.evaluation_count < max_evaluations:
+            step = self._next_generation_batch(evaluator, operators, genes, fitness, max_evaluations)
+            if step is None: break
+            genes, fitness = step
+            generation += 1
+            if config.local_search and generation % config.ls_interval == 0:
+                self._memetic_step_batch(evaluator, genes, fitness)
+
+            gen_best_idx = int(np.argmin(fitness))
+            if fitness[gen_best_idx] < best_fitness:
+                best_fitness, best_genes = float(fitness[gen_best_idx]), genes[gen_best_idx].copy()
+                stagnation_counter = 0
+            else:
+                stagnation_counter += 1
+
+            run_history.append(float(fitness[gen_best_idx]))
+            evaluation_history.append(self.evaluation_count)
+            elapsed_history.append(time.perf_counter() - self._run_start)
+            self.telemetry.end_generation(self.evaluation_count, best_fitness, self.diversity if config.diversity_control else None)
+
+            if stagnation_counter >= config.max_stagnation:
+                print(f"\nEstagnação máxima ({config.max_stagnation}) atingida. Parando a execução.")
+                break
+            stop_reason = self._stop_reason(best_fitness)
+            if stop_reason:
+                print(f"\n{stop_reason}. Parando a execução.")
+                break
+            if self._checkpoint_due(generation):
+                self._save_checkpoint({
+                    'genes': genes, 'fitness': fitness, 'best_genes': best_genes, 'best_fitness': best_fitness,
+                    'evaluations': self.evaluation_count, 'stagnation': stagnation_counter, 'generation': generation,
+                    'history': run_history, 'evaluation_history': evaluation_history, 'elapsed': elapsed_history})
+
+        return best_fitness, evaluator.decode_row(best_genes), run_history, evaluation_history, elapsed_history
+
+    def _next_generation_batch(self, evaluator: AvaliadorLoteEVRP, operators: OperadoresLoteEVRP, genes: np.ndarray,
+                               fitness: np.ndarray, max_evaluations: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Uma geração do modo 'batch': elitismo, torneio, OX, mutação, reparo e avaliação sobre a matriz
+        de genes. Retorna os novos genes e fitness, ou None se não houver filhos a gerar."""
+        instance, config = self.instance, self.config
+        telemetry = self.instrumentation
+        elite_size = max(1, int(config.elitism_rate * config.pop_size))
+        order = np.argsort(fitness, kind='stable')
+        genes, fitness = genes[order], fitness[order]
+        pop = len(fitness)
+        num_offspring = min(config.pop_size - elite_size, max_evaluations - self.evaluation_count)
+        if num_offspring <= 0: return None
+        if telemetry is not None: start = telemetry.start()
+
+        # Torneio sem reposição: com a população ordenada, o vencedor é o menor índice sorteado.
+        tournament_size = min(config.tournament_size, pop)
+        draws = np.random.random((2 * num_offspring, pop))
+        contenders = np.argpartition(draws, tournament_size - 1, axis=1)[:, :tournament_size]
+        parents = contenders.min(axis=1)
+        if telemetry is not None: start = telemetry.lap('selection', start, 2 * num_offspring)
+
+        child_genes = operators.crossover(genes[parents[0::2]], genes[parents[1::2]], config.crossover_rate)
+        if telemetry is not None: start = telemetry.lap('crossover', start, num_offspring)
+        child_genes = operators.mutate(child_genes, config.mutation_rate)
+        if telemetry is not None: start = telemetry.lap('mutation', start, num_offspring)
+        child_fitness, child_valid = evaluator.evaluate(child_genes)
+        invalid = np.flatnonzero(~child_valid)
+        if telemetry is not None:
+            start = telemetry.lap('evaluation', start, num_offspring)
+            telemetry.offspring += num_offspring
+            telemetry.invalid_offspring += int(invalid.size)
+        if invalid.size:
+            repaired = evaluator.pack([repair_genes(child_genes[i].tolist(), instance.customers, instance.depot, instance.vehicles)
+                                       for i in invalid], genes.shape[1])
+            if telemetry is not None: start = telemetry.lap('repair', start, int(invalid.size))
+            repaired_fitness, repaired_valid = evaluator.evaluate(repaired)
+            if telemetry is not None:
+                telemetry.lap('evaluation', start, int(invalid.size))
+                telemetry.repair_failures += int((~repaired_valid).sum())
+            child_genes[invalid], child_fitness[invalid] = repaired, repaired_fitness
+            still_invalid = invalid[~repaired_valid]
+            if still_invalid.size:
+                replacements = np.array([random.randrange(pop) for _ in still_invalid])
+                child_genes[still_invalid], child_fitness[still_invalid] = genes[replacements], fitness[replacements]
+
+        self.evaluation_count += num_offspring
+        genes = np.vstack((genes[:elite_size], child_genes))
+        fitness = np.concatenate((fitness[:elite_size], child_fitness))
+        if config.diversity_control:
+            genes, fitness = self._control_diversity_batch(evaluator, genes, fitness, elite_size, max_evaluations)
+        return genes, fitness
+
+    def _control_diversity_batch(self, evaluator: AvaliadorLoteEVRP, genes: np.ndarray, fitness: np.ndarray,
+                                 elite_size: int, max_evaluations: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Versão de _control_diversity para o modo 'batch': as linhas com rota repetida (a elite vem primeiro e
+        é preservada) e, com diversidade baixa, as piores são trocadas por imigrantes aleatórios."""
+        instance, config = self.instance, self.config
+        routes = [evaluator.decode_row(row) for row in genes]
+        index = DiversidadePopulacao(instance.depot)
+        keep = np.array([index.add(route) for route in routes])
+        self.rejected_duplicates += int((~keep).sum())
+        if index.entropy() < config.diversity_threshold:
+            survivors = max(elite_size, int(len(fitness) * (1 - config.immigration_rate)))
+            order = np.argsort(np.where(keep, fitness, np.inf), kind='stable')[:survivors]
+            index, keep = DiversidadePopulacao(instance.depot), np.zeros(len(fitness), dtype=bool)
+            for row in order:
+                keep[row] = index.add(routes[row])
+            self.immigrations += 1
+        genes, fitness = genes[keep], fitness[keep]
+
+        missing = min(config.pop_size - len(fitness), max_evaluations - self.evaluation_count)
+        if missing > 0:
+            immigrants = evaluator.pack([generate_random_genes(instance.customers, instance.depot, instance.vehicles)
+                                         for _ in range(missing)], genes.shape[1])
+            immigrant_fitness, immigrant_valid = evaluator.evaluate(immigrants)
+            self.evaluation_count += missing
+            accepted = np.array([bool(valid) and index.add(evaluator.decode_row(row))
+                                 for row, valid in zip(immigrants, immigrant_valid)])
+            genes = np.vstack((genes, immigrants[accepted]))
+            fitness = np.concatenate((fitness, immigrant_fitness[accepted]))
+        self.diversity = index.entropy()
+        return genes, fitness
+
+    def _memetic_step_batch(self, evaluator: AvaliadorLoteEVRP, genes: np.ndarray, fitness: np.ndarray):
+        """Versão de _memetic_step para o modo 'batch': altera as linhas de `genes`/`fitness` no lugar."""
+        if self._local_search is None:
+            self._local_search = BuscaLocalEVRP(self.instance, self.config.ls_neighbors)
+        elite = np.argsort(fitness, kind='stable')[:self.config.ls_elite]
+        for row in elite:
+            route, delta = self._local_search.improve(evaluator.decode_row(genes[row]), self.config.ls_max_moves)
+            if delta < -1e-9:
+                improved = evaluator.pack([route[1:-1]], genes.shape[1])
+                improved_fitness, improved_valid = evaluator.evaluate(improved)
+                self.evaluation_count += 1
+                if improved_valid[0] and improved_fitness[0] < fitness[row]:
+                    genes[row], fitness[row] = improved[0], improved_fitness[0]
+
+    def _execute_run(self, run_num: int, max_evaluations: int, seed: Optional[int] = None) -> Dict:
+        """Executa uma única repetição do AG e retorna o dicionário de resultados da execução.
+
+        Com checkpoints ativos, uma execução já concluída devolve o resultado gravado e uma
+        interrompida continua do último checkpoint (população, RNGs, melhor solução e histórico).
+        """
+        checkpoint = self._load_checkpoint(run_num)
+        if checkpoint is not None and checkpoint['status'] == 'done':
+            print(f"\n--- Execução {run_num}/{self.config.runs} para a instância {self.instance.name}: concluída (checkpoint) ---")
+            return checkpoint['result']
+        resume = checkpoint['state'] if checkpoint is not None else None
+        print(f"\n--- Execução {run_num}/{self.config.runs} para a instância {self.instance.name} ---")
+        print(f"Orçamento de avaliações: {max_evaluations:,}")
+        if resume is not None:
+            print(f"Retomando do checkpoint: geração {resume['generation']}, {resume['evaluations']:,} avaliações")
+            random.setstate(resume['random_state'])
+            np.random.set_state(resume['numpy_state'])
+        elif seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        if self.fitness_cache is not None:
+            self.fitness_cache.clear()
+        previous_time = resume['run_time'] if resume is not None else 0.0
+        start_time = time.time() - previous_time
+        self._run_start = time.perf_counter() - previous_time
+        self._checkpoint_run = run_num
+        self.diversity, self.rejected_duplicates, self.immigrations = 1.0, 0, 0
+
+        if self.config.decoder not in ('separators', 'split'):
+            raise ValueError(f"Decodificador desconhecido: '{self.config.decoder}'")
+        if self.config.evaluation_mode == 'batch':
+            if self.config.decoder != 'separators' or self.config.evrp_constraints:
+                raise ValueError("O modo 'batch' suporta apenas o decodificador 'separators' sem as restrições do EVRP.")
+            evolve = self._evolve_batch
+        elif self.config.evaluation_mode == 'object':
+            evolve = self._evolve_objects
+        else:
+            raise ValueError(f"Modo de avaliação desconhecido: '{self.config.evaluation_mode}'")
+        self.telemetry = self._open_telemetry(run_num, max_evaluations)
+        try:
+            best_fitness, best_route, run_history, evaluation_history, elapsed_history = evolve(max_evaluations, resume)
+        finally:
+            self.telemetry.close()
+
+        exec_time = time.time() - start_time
+        gap = (best_fitness - self.instance.optimal_value) / self.instance.optimal_value * 100
+        print(f"Melhor fitness encontrado: {best_fitness:.4f} (Gap: {gap:.2f}%)")
+        run_result = {'run': run_num, 'fitness': best_fitness, 'gap': gap, 'time': exec_time, 'route': best_route,
+                      'history': run_history, 'evaluations': evaluation_history, 'elapsed': elapsed_history}
+        if self.fitness_cache is not None:
+            cache = self.fitness_cache
+            print(f"Cache de fitness: {cache.hits:,} acertos, {cache.misses:,} falhas (taxa de acerto {cache.hit_rate:.1%})")
+            run_result['cache'] = {'hits': cache.hits, 'misses': cache.misses, 'size': len(cache.entries)}
+        if self.config.diversity_control:
+            print(f"Diversidade final: {self.diversity:.3f} ({self.rejected_duplicates:,} filhos repetidos rejeitados, "
+                  f"{self.immigrations} imigrações)")
+            run_result['diversity'] = {'final': self.diversity, 'rejected_duplicates': self.rejected_duplicates,
+                                       'immigrations': self.immigrations}
+        if self.instrumentation is not None:
+            run_result['telemetry'] = self._report_telemetry(self.instrumentation.summary())
+        self.telemetry = self.instrumentation = None
+        if self.config.checkpoint_interval > 0:
+            self._write_checkpoint(self._checkpoint_path(run_num), {'status': 'done', 'result': run_result})
+        return run_result
+
+    def _stop_reason(self, best_fitness: float) -> Optional[str]:
+        """Critérios de parada do modo "anytime": gap alvo atingido ou orçamento de tempo esgotado."""
+        config, optimal = self.config, self.instance.optimal_value
+        if config.target_gap is not None and optimal > 0 and (best_fitness - optimal) / optimal * 100 <= config.target_gap:
+            return f"Gap alvo ({config.target_gap:.2f}%) atingido"
+        if config.time_budget is not None and time.perf_counter() - self._run_start >= config.time_budget:
+            return f"Orçamento de tempo ({config.time_budget:.0f}s) esgotado"
+        return None
+
+    # --- Checkpoints ---
+    def _checkpoint_path(self, run_num: Optional[int] = None) -> str:
+        """Um arquivo por execução (permite gravar a partir dos workers) e um com as sementes do experimento."""
+        name = f"run{run_num}.pkl" if run_num is not None else "experiment.pkl"
+        return os.path.join(self.config.checkpoint_dir, self.instance.name, name)
+
+    def _write_checkpoint(self, path: str, payload: Dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Troca atômica: um processo interrompido não deixa checkpoint pela metade
+
+    def _checkpoint_due(self, generation: int) -> bool:
+        interval = self.config.checkpoint_interval
+        return interval > 0 and generation % interval == 0
+
+    def _save_checkpoint(self, state: Dict):
+        state.update({'random_state': random.getstate(), 'numpy_state': np.random.get_state(),
+                      'run_time': time.perf_counter() - self._run_start})
+        self._write_checkpoint(self._checkpoint_path(self._checkpoint_run), {'status': 'running', 'state': state})
+
+    def _load_checkpoint(self, run_num: Optional[int] = None) -> Optional[Dict]:
+        if self.config.checkpoint_interval <= 0:
+            return None
+        path = self._checkpoint_path(run_num)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _experiment_fingerprint(self) -> str:
+        """Hash do arquivo da instância e das opções que afetam a busca; opções de execução/relatório podem mudar na retomada."""
+        ignored = {'workers', 'reporting', 'plots', 'time_budget', 'checkpoint_interval', 'checkpoint_dir',
+                   'telemetry', 'telemetry_interval', 'telemetry_batch'}
+        settings = sorted((key, value) for key, value in asdict(self.config).items() if key not in ignored)
+        with open(self.instance.filename, 'rb') as f:
+            digest = hashlib.sha1(f.read())
+        digest.update(repr(settings).encode())
+        return digest.hexdigest()
+
+    def _clear_checkpoints(self):
+        if self.config.checkpoint_interval > 0:
+            shutil.rmtree(os.path.join(self.config.checkpoint_dir, self.instance.name), ignore_errors=True)
+
+    def _open_telemetry(self, run_num: int, max_evaluations: int) -> TelemetriaEVRP:
+        """Cria o fluxo de telemetria da execução com os destinos ativos (barra de progresso e/ou arquivo JSONL)."""
+        sinks = []
+        if self.show_progress:
+            sinks.append(ProgressoTqdm(max_evaluations))
+        if self.config.telemetry:
+            sinks.append(ArquivoJSONL(f"results/{self.instance.name}_run{run_num}_telemetry.jsonl", self.config.telemetry_batch))
+        telemetry = TelemetriaEVRP(run_num, sinks, self.config.telemetry, self.config.telemetry_interval)
+        self.instrumentation = telemetry if self.config.telemetry else None
+        return telemetry
+
+    def _report_telemetry(self, summary: Dict) -> Dict:
+        total = sum(summary['seconds'].values())
+        print(f"Telemetria: {summary['evals_per_sec'] or 0:,.0f} aval/s, filhos inválidos {summary['invalid_rate']:.1%} "
+              f"({summary['repair_failures']:,} sem reparo)")
+        for op in TelemetriaEVRP.OPERATORS:
+            seconds = summary['seconds'][op]
+            share = seconds / total if total > 0 else 0.0
+            print(f"  {op:<12}{seconds:>9.3f}s ({share:>6.1%}) em {summary['calls'][op]:,} chamadas")
+        return summary
+
+    def _max_evaluations(self) -> int:
+        n = self.instance.customers + 1 + self.instance.num_stations
+        return 25000 * n
+
+    def _run_seeds(self) -> Dict[int, int]:
+        """Semente explícita de cada execução, derivada da semente base (sorteada se não configurada).
+
+        Com checkpoints ativos, um experimento interrompido com a mesma instância e configuração
+        reaproveita as sementes gravadas; checkpoints de outra configuração são descartados.
+        """
+        fingerprint = self._experiment_fingerprint() if self.config.checkpoint_interval > 0 else None
+        experiment = self._load_checkpoint()
+        if experiment is not None:
+            if experiment['fingerprint'] == fingerprint:
+                print(f"Retomando experimento interrompido (semente base: {experiment['base_seed']})")
+                return experiment['run_seeds']
+            print("AVISO: checkpoints de outra configuração encontrados; iniciando um novo experimento.")
+        self._clear_checkpoints()  # Descarta arquivos de execuções que não pertencem a este experimento
+        base_seed = self.config.seed if self.config.seed is not None else random.randrange(2**32)
+        print(f"Semente base: {base_seed}")
+        run_seeds = {run_num: int(np.random.SeedSequence([base_seed, run_num]).generate_state(1)[0])
+                     for run_num in range(1, self.config.runs + 1)}
+        if fingerprint is not None:
+            self._write_checkpoint(self._checkpoint_path(), {'fingerprint': fingerprint, 'base_seed': base_seed,
+                                                             'run_seeds': run_seeds})
+        return run_seeds
+
+    def _report_run(self, run_result: Dict, plots: bool = True):
+        self._save_run_results(run_result)
+        if plots:
+            self._plot_run(run_result)
+
+    def _plot_run(self, run_result: Dict):
+        self._plot_convergence(run_result)
+        self._plot_solution_routes(run_result)
+        if 'island_histories' in run_result:
+            self._plot_island_convergence(run_result)
+
+    def _report_summary(self, results: List[Dict], plots: bool = True):
+        self._save_summary_results(results)
+        if plots:
+            self._plot_comparison(results)
+
+    @contextmanager
+    def _process_pool(self, max_workers: int):
+        """Pool de processos cujos workers compartilham a matriz de distâncias em vez de recebê-la copiada.
+
+        Matrizes em memória vão por memória compartilhada, matrizes 'memmap' pelo caminho do
+        arquivo; o backend 'on_demand' não tem matriz e cada worker usa as próprias coordenadas.
+        """
+        matrix, shm, matrix_spec = self.instance.dist_matrix, None, None
+        try:
+            if isinstance(matrix, np.memmap):
+                matrix_spec = ('memmap', matrix.filename, matrix.shape, matrix.dtype.str)
+            elif isinstance(matrix, np.ndarray):
+                shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+                np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+                matrix_spec = ('shm', shm.name, matrix.shape, matrix.dtype.str)
+            initargs = (self.instance.filename, self.config, matrix_spec)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_run_worker, initargs=initargs) as pool:
+                yield pool
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def _run_parallel(self, max_evaluations: int, run_seeds: Dict[int, int]) -> List[Dict]:
+        """Distribui as execuções independentes entre `config.workers` processos."""
+        with self._process_pool(self.config.workers) as pool:
+            futures = [pool.submit(_run_worker, run_num, max_evaluations, seed) for run_num, seed in run_seeds.items()]
+            results = [future.result() for future in futures]
+        return [result for result in results if result is not None]
+
+    # --- Modelo de Ilhas ---
+    def _migration_targets(self, island: int) -> List[int]:
+        num_islands = self.config.islands
+        if self.config.migration_topology == 'ring':
+            return [(island + 1) % num_islands]
+        if self.config.migration_topology == 'full':
+            return [other for other in range(num_islands) if other != island]
+        raise ValueError(f"Topologia de migração desconhecida: '{self.config.migration_topology}'")
+
+    def _migrate(self, states: List[Dict]):
+        """Copia os `migrants` melhores de cada ilha para suas vizinhas, substituindo os piores de lá."""
+        emigrants = []
+        for state in states:
+            order = sorted(range(len(state['fitness'])), key=lambda i: state['fitness'][i])[:self.config.migrants]
+            emigrants.append([(state['genes'][i], state['fitness'][i]) for i in order])
+        incoming: List[List[Tuple[List[int], float]]] = [[] for _ in states]
+        for island, migrants in enumerate(emigrants):
+            for target in self._migration_targets(island):
+                incoming[target].extend(migrants)
+        for state, immigrants in zip(states, incoming):
+            immigrants = immigrants[:max(0, len(state['fitness']) - 1)]
+            order = sorted(range(len(state['fitness'])), key=lambda i: state['fitness'][i], reverse=True)
+            for slot, (genes, fitness) in zip(order, immigrants):
+                state['genes'][slot], state['fitness'][slot] = list(genes), fitness
+
+    def _execute_island_run(self, pool: ProcessPoolExecutor, run_num: int, max_evaluations: int, seed: int) -> Dict:
+        """Uma execução do modelo de ilhas: o orçamento de avaliações é dividido entre as ilhas."""
+        print(f"\n--- Execução {run_num}/{self.config.runs} (modelo de ilhas) para a instância {self.instance.name} ---")
+        print(f"Orçamento de avaliações: {max_evaluations:,} em {self.config.islands} ilhas "
+              f"(topologia '{self.config.migration_topology}', migração a cada {self.config.migration_interval} gerações)")
+        start_time = time.time()
+        self._run_start = time.perf_counter()
+        island_seeds = np.random.SeedSequence(seed).generate_state(self.config.islands)
+        island_budget = max_evaluations // self.config.islands
+        states = [{'island': i, 'seed': int(island_seeds[i]), 'rng_state': None, 'genes': None, 'fitness': None,
+                   'evaluations': 0, 'history': [], 'evaluation_history': [], 'elapsed': [], 'start_time': start_time}
+                  for i in range(self.config.islands)]
+        best_fitness, best_genes, stagnation = float('inf'), None, 0
+
+        while True:
+            states = list(pool.map(_island_worker, states, [self.config.migration_interval] * len(states),
+                                   [island_budget] * len(states)))
+            epoch_best = min((state['fitness'][i], state['genes'][i]) for state in states for i in range(len(state['fitness'])))
+            if epoch_best[0] < best_fitness:
+                best_fitness, best_genes, stagnation = epoch_best[0], epoch_best[1], 0
+            else:
+                stagnation += self.config.migration_interval
+            if all(state['evaluations'] >= island_budget for state in states):
+                break
+            if stagnation >= self.config.max_stagnation:
+                print(f"\nEstagnação máxima ({self.config.max_stagnation}) atingida. Parando a execução.")
+                break
+            stop_reason = self._stop_reason(best_fitness)
+            if stop_reason:
+                print(f"\n{stop_reason}. Parando a execução.")
+                break
+            self._migrate(states)
+
+        island_histories = [state['history'] for state in states]
+        longest = max(len(history) for history in island_histories)
+        def at(history: List, g: int):
+            return history[min(g, len(history) - 1)]  # Ilhas que pararam antes repetem o último valor
+        run_history = [min(at(history, g) for history in island_histories) for g in range(longest)]
+        # Avaliações somadas entre as ilhas e tempo até todas terem concluído a geração g
+        evaluation_history = [sum(at(state['evaluation_history'], g) for state in states) for g in range(longest)]
+        elapsed_history = [max(at(state['elapsed'], g) for state in states) for g in range(longest)]
+        best_route = CromossomoEVRP(self, best_genes).solution_route
+        exec_time = time.time() - start_time
+        gap = (best_fitness - self.instance.optimal_value) / self.instance.optimal_value * 100
+        for state in states:
+            print(f"  Ilha {state['island'] + 1}: melhor {min(state['fitness']):.4f} em {len(state['history'])} gerações")
+        print(f"Melhor fitness encontrado: {best_fitness:.4f} (Gap: {gap:.2f}%)")
+        return {'run': run_num, 'fitness': best_fitness, 'gap': gap, 'time': exec_time, 'route': best_route,
+                'history': run_history, 'evaluations': evaluation_history, 'elapsed': elapsed_history,
+                'island_histories': island_histories}
+
+    def run_islands(self) -> Dict:
+        """Modo alternativo a run(): cada execução usa `config.islands` subpopulações em processos separados."""
+        if self.config.islands < 2:
+            raise ValueError("O modelo de ilhas requer ao menos 2 ilhas.")
+        if self.config.evaluation_mode == 'batch':
+            raise ValueError("O modelo de ilhas não suporta evaluation_mode='batch'; use 'object'.")
+        max_evaluations = self._max_evaluations()
+        run_seeds = self._run_seeds()
+
+        with RelatorioEVRP(self) as reporter, self._process_pool(self.config.islands) as pool:
+            for run_num, seed in run_seeds.items():
+                try:
+                    reporter.submit(self._execute_island_run(pool, run_num, max_evaluations, seed))
+                except (RuntimeError, ValueError) as e:
+                    print(f"Erro crítico na execução {run_num}: {e}")
+                    continue
+        self._clear_checkpoints()
+        self._update_archive(reporter.results)
+        return self._analyze_final_results(reporter.results)
+
+    # --- Decomposição por agrupamento ---
+    def _cluster_count(self) -> int:
+        return min(self.instance.vehicles, max(1, -(-self.instance.customers // max(1, self.config.cluster_size))))
+
+    def _allocate_vehicles(self, clusters: List[List[int]]) -> List[int]:
+        """Veículos por grupo: o mínimo que a capacidade exige (ao menos 1), com as sobras distribuídas
+        para os grupos de maior demanda por veículo, sem passar de VEHICLES no total."""
+        instance = self.instance
+        demands = [float(instance.demand_array[cluster].sum()) for cluster in clusters]
+        allocation = [max(1, int(np.ceil(d / instance.capacity))) if instance.capacity > 0 else 1 for d in demands]
+        while sum(allocation) > instance.vehicles and max(allocation) > 1:
+            allocation[allocation.index(max(allocation))] -= 1
+        for _ in range(instance.vehicles - sum(allocation)):
+            j = max(range(len(clusters)), key=lambda j: demands[j] / allocation[j])
+            allocation[j] += 1
+        return allocation
+
+    def _solve_clusters(self, pool: Optional[ProcessPoolExecutor], clusters: List[List[int]], vehicles: List[int],
+                        indices: List[int], seeds: Dict[int, int], workdir: str) -> Tuple[Dict[int, Tuple[List[List[int]], int]], List[int]]:
+        """Resolve os grupos `indices` com o AG (em paralelo se houver pool) e devolve, por grupo, os tours
+        com a numeração original e as avaliações gastas, além dos grupos sem solução válida."""
+        sub_config = replace(self.config, runs=1, workers=1, seed=None, target_gap=None, checkpoint_interval=0,
+                             telemetry=False, instance_cache=False, distance_backend='dense')
+        stem = os.path.splitext(self.instance.name)[0]
+        jobs = {}
+        for j in indices:
+            path = os.path.join(workdir, f"{stem}.c{j}.{seeds[j]}.evrp")
+            write_sub_instance(self.instance, clusters[j], vehicles[j], path)
+            args = (path, sub_config, seeds[j])
+            jobs[j] = pool.submit(_cluster_worker, *args) if pool is not None else partial(_cluster_worker, *args)
+        solved, failed = {}, []
+        for j, job in jobs.items():
             try:
-                population = self._initialize_population()
-                self.evaluation_count = len(population)
-                best_solution_so_far = min(population, key=lambda ind: ind.fitness)
-                stagnation_counter, run_history = 0, []
-                
-                progress_bar = tqdm(total=max_evaluations, desc="Avaliações", unit="eval", initial=self.evaluation_count)
-                
-                while self.evaluation_count < max_evaluations:
-                    elite_size = max(1, int(self.config.elitism_rate * self.config.pop_size))
-                    population.sort(key=lambda ind: ind.fitness)
-                    next_generation = population[:elite_size]
-                    
-                    while len(next_generation) < self.config.pop_size:
-                        p1, p2 = self._select_parent(population), self._select_parent(population)
-                        child = p1.crossover(p2).mutate()
-                        if not child.is_valid: child = child.repair()
-                        self.evaluation_count += 1
-                        progress_bar.update(1)
-                        next_generation.append(child if child.is_valid else random.choice(population))
-                        if self.evaluation_count >= max_evaluations: break
-                    
-                    population = next_generation
-                    current_best_in_gen = min(population, key=lambda ind: ind.fitness)
-                    if current_best_in_gen.fitness < best_solution_so_far.fitness:
-                        best_solution_so_far = current_best_in_gen
-                        stagnation_counter = 0
-                    else:
-                        stagnation_counter += 1
-                    
-                    if [ind.fitness for ind in population if ind.is_valid]: run_history.append(current_best_in_gen.fitness)
-                    
-                    if stagnation_counter >= self.config.max_stagnation:
-                        print(f"\nEstagnação máxima ({self.config.max_stagnation}) atingida. Parando a execução.")
-                        break
-                
-                progress_bar.close()
-                exec_time = time.time() - start_time
-                gap = (best_solution_so_far.fitness - self.instance.optimal_value) / self.instance.optimal_value * 100
-                print(f"Melhor fitness encontrado: {best_solution_so_far.fitness:.4f} (Gap: {gap:.2f}%)")
-                
-                run_result = {'run': run_num, 'fitness': best_solution_so_far.fitness, 'gap': gap, 'time': exec_time, 'route': best_solution_so_far.route, 'history': run_history}
-                all_runs_results.append(run_result)
-                
-                # Chamadas para salvar resultados e gráficos
-                self._save_run_results(run_result)
-                self._plot_convergence(run_result)
-                self._plot_solution_routes(run_result) # <<< NOVA CHAMADA AQUI
-
-            except (RuntimeError, ValueError) as e:
-                print(f"Erro crítico na execução {run_num}: {e}")
+                route, evaluations = job.result() if pool is not None else job()
+            except RuntimeError as e:
+                print(f"Grupo {j} sem solução válida ({e})")
+                failed.append(j)
                 continue
-        
-        self._save_summary_results(all_runs_results)
-        self._plot_comparison(all_runs_results)
-        return self._analyze_final_results(all_runs_results)
+            tours, tour = [], []
+            for node in route[1:]:
+                if node == 1:
+                    if tour: tours.append(tour)
+                    tour = []
+                else:
+                    tour.append(clusters[j][node - 2])
+            solved[j] = (tours, evaluations)
+        return solved, failed
+
+    def _merge_clusters(self, tours_by_cluster: List[List[List[int]]]) -> CromossomoEVRP:
+        depot = self.instance.depot
+        route = [depot]
+        for tours in tours_by_cluster:
+            for tour in tours:
+                route += tour + [depot]
+        genes = [node for node in route if node != depot] if self.config.decoder == 'split' else route[1:-1]
+        return CromossomoEVRP(self, genes)
+
+    def _execute_decomposed_run(self, pool: Optional[ProcessPoolExecutor], run_num: int, seed: int) -> Dict:
+        """Uma execução do modo de decomposição: particiona, resolve cada grupo, junta as rotas e, a cada
+        rodada, troca clientes de fronteira e resolve de novo apenas os grupos alterados."""
+        config = self.config
+        if config.decomposition not in ('sweep', 'kmeans'):
+            raise ValueError(f"Particionamento desconhecido: '{config.decomposition}'")
+        partitioner = ParticionadorEVRP(self.instance, config.boundary_neighbors)
+        k = self._cluster_count()
+        clusters = partitioner.kmeans(k, seed) if config.decomposition == 'kmeans' else partitioner.sweep(k)
+        print(f"\n--- Execução {run_num}/{config.runs} (decomposição '{config.decomposition}') para a instância {self.instance.name} ---")
+        print(f"{len(clusters)} grupos de {min(map(len, clusters))} a {max(map(len, clusters))} clientes, até {config.decomposition_rounds} rodadas de fronteira")
+        start_time = time.time()
+        self._run_start = time.perf_counter()
+
+        tours_by_cluster: List[List[List[int]]] = [[] for _ in clusters]
+        allocation: List[int] = [0] * len(clusters)
+        changed: Set[int] = set(range(len(clusters)))
+        best, evaluations = None, 0
+        run_history, evaluation_history, elapsed_history = [], [], []
+        with tempfile.TemporaryDirectory() as workdir:
+            for round_num in range(config.decomposition_rounds + 1):
+                if config.evrp_constraints:  # Só então a capacidade limita os tours de cada grupo
+                    changed |= partitioner.fit_capacity(clusters, self.instance.vehicles)
+                solved_count = 0
+                while True:
+                    new_allocation = self._allocate_vehicles(clusters)
+                    changed |= {j for j in range(len(clusters)) if new_allocation[j] != allocation[j]}
+                    allocation = new_allocation
+                    seeds = {j: int(np.random.SeedSequence([seed, round_num, j]).generate_state(1)[0]) for j in changed}
+                    solved, failed = self._solve_clusters(pool, clusters, allocation, sorted(changed), seeds, workdir)
+                    for j, (tours, cluster_evaluations) in solved.items():
+                        tours_by_cluster[j] = tours
+                        evaluations += cluster_evaluations
+                    solved_count += len(solved)
+                    if not failed: break
+                    if len(clusters) == 1:
+                        raise RuntimeError("Não foi possível resolver a instância nem como um único grupo.")
+                    # Cada grupo inviável é absorvido pelo vizinho mais próximo, que é resolvido de novo com os
+                    # veículos dos dois; no limite volta-se à instância inteira
+                    changed = set()
+                    for j in sorted(failed, reverse=True):
+                        target = partitioner.merge_nearest(clusters, j)
+                        del tours_by_cluster[j], allocation[j]
+                        changed = {t if t < j else t - 1 for t in changed if t != j} | {target}
+                    for j in changed:
+                        allocation[j] = 0
+                    print(f"{len(failed)} grupo(s) unido(s) ao vizinho mais próximo: {len(clusters)} grupos")
+                merged = self._merge_clusters(tours_by_cluster)
+                if best is None or merged.fitness < best.fitness:
+                    best = merged
+                print(f"Rodada {round_num}: {solved_count} grupos resolvidos, fitness combinado {merged.fitness:.4f}")
+                run_history.append(best.fitness)
+                evaluation_history.append(evaluations)
+                elapsed_history.append(time.perf_counter() - self._run_start)
+
+                stop_reason = self._stop_reason(best.fitness)
+                if stop_reason:
+                    print(f"{stop_reason}. Parando a execução.")
+                    break
+                if round_num == config.decomposition_rounds: break
+                changed = partitioner.move_boundary(clusters, tours_by_cluster, config.evrp_constraints)
+                if not changed: break
+                moved = self._merge_clusters(tours_by_cluster)  # As trocas de fronteira já são movimentos de melhoria
+                if moved.fitness < best.fitness:
+                    best = moved
+
+        exec_time = time.time() - start_time
+        gap = (best.fitness - self.instance.optimal_value) / self.instance.optimal_value * 100
+        print(f"Melhor fitness encontrado: {best.fitness:.4f} (Gap: {gap:.2f}%)")
+        return {'run': run_num, 'fitness': best.fitness, 'gap': gap, 'time': exec_time, 'route': best.solution_route,
+                'history': run_history, 'evaluations': evaluation_history, 'elapsed': elapsed_history,
+                'clusters': [len(cluster) for cluster in clusters]}
+
+    def run_decomposed(self) -> Dict:
+        """Modo alternativo a run() para instâncias grandes: cada execução resolve os grupos de clientes
+        como sub-instâncias independentes, distribuídas entre `config.workers` processos."""
+        run_seeds = self._run_seeds()
+        pool_context = ProcessPoolExecutor(max_workers=self.config.workers) if self.config.workers > 1 else nullcontext()
+        with RelatorioEVRP(self) as reporter, pool_context as pool:
+            for run_num, seed in run_seeds.items():
+                try:
+                    reporter.submit(self._execute_decomposed_run(pool, run_num, seed))
+                except (RuntimeError, ValueError) as e:
+                    print(f"Erro crítico na execução {run_num}: {e}")
+                    continue
+        self._clear_checkpoints()
+        self._update_archive(reporter.results)
+        return self._analyze_final_results(reporter.results)
+
+    def run(self) -> Dict:
+        max_evaluations = self._max_evaluations()
+        run_seeds = self._run_seeds()
+
+        with RelatorioEVRP(self) as reporter:
+            if self.config.workers > 1:
+                for run_result in self._run_parallel(max_evaluations, run_seeds):
+                    reporter.submit(run_result)
+            else:
+                for run_num, seed in run_seeds.items():
+                    try:
+                        reporter.submit(self._execute_run(run_num, max_evaluations, seed))
+                    except (RuntimeError, ValueError) as e:
+                        print(f"Erro crítico na execução {run_num}: {e}")
+                        continue
+        self._clear_checkpoints()
+        self._update_archive(reporter.results)
+        return self._analyze_final_results(reporter.results)
     
     # --- Nova Função de Plotagem de Rota ---
     def _plot_solution_routes(self, result: Dict):
@@ -357,7 +2385,6 @@ class AlgoritmoGeneticoEVRP:
         return tours
 
     def _save_run_results(self, result: Dict):
-        # (Implementação sem alterações)
         filename = f"results/{self.instance.name}_run{result['run']}.txt"
         with open(filename, 'w') as f:
             f.write(f"Resultados para Instância: {self.instance.name} - Execução {result['run']}\n"
@@ -371,6 +2398,10 @@ class AlgoritmoGeneticoEVRP:
             for i, tour in enumerate(vehicle_tours, 1):
                 dist = self.instance.calculate_route_distance(tour)
                 f.write(f"  Veículo {i}: {' -> '.join(map(str, tour))} (Distância: {dist:.2f})\n")
+            if 'island_histories' in result:
+                f.write("\nConvergência por Ilha (melhor fitness a cada geração):\n")
+                for i, history in enumerate(result['island_histories'], 1):
+                    f.write(f"  Ilha {i}: {', '.join(f'{value:.2f}' for value in history)}\n")
 
     def _plot_convergence(self, result: Dict):
         # (Implementação sem alterações)
@@ -386,6 +2417,20 @@ class AlgoritmoGeneticoEVRP:
         plt.savefig(f"plots/convergence_{self.instance.name}_run{result['run']}.png")
         plt.close()
     
+    def _plot_island_convergence(self, result: Dict):
+        plt.figure(figsize=(12, 7))
+        for i, history in enumerate(result['island_histories'], 1):
+            plt.plot(history, alpha=0.8, label=f'Ilha {i}')
+        plt.axhline(y=self.instance.optimal_value, color='r', linestyle='--', label=f'Ótimo Conhecido ({self.instance.optimal_value:.2f})')
+        plt.xlabel('Geração')
+        plt.ylabel('Distância Total (Fitness)')
+        plt.title(f"Convergência por Ilha - {self.instance.name} (Execução {result['run']})")
+        plt.legend()
+        plt.grid(True, linestyle='--', linewidth=0.5)
+        plt.tight_layout()
+        plt.savefig(f"plots/islands_{self.instance.name}_run{result['run']}.png")
+        plt.close()
+    
     def _save_summary_results(self, results: List[Dict]):
         # (Implementação sem alterações)
         if not results: return
@@ -432,10 +2477,191 @@ class AlgoritmoGeneticoEVRP:
         
         return {'best_overall_fitness': best_run['fitness'], 'best_route': best_run['route']}
 
-# --- Função Principal (sem alterações) ---
+# --- Relatórios ---
+class RelatorioEVRP:
+    """Etapa de relatórios alimentada pelas execuções concluídas (arquivos de resultado e gráficos).
+
+    Com config.reporting='async' cada tarefa entra na fila de um processo separado, que
+    carrega sua própria cópia da instância, e a execução seguinte começa sem esperar o
+    matplotlib; a saída do `with` aguarda as tarefas pendentes. config.plots escolhe quando
+    os gráficos são gerados: 'each', 'deferred', 'best' ou 'none' (só arquivos de texto/CSV).
+    """
+    def __init__(self, solver: 'AlgoritmoGeneticoEVRP'):
+        config = solver.config
+        if config.reporting not in ('sync', 'async'):
+            raise ValueError(f"Modo de relatório desconhecido: '{config.reporting}'")
+        if config.plots not in ('each', 'deferred', 'best', 'none'):
+            raise ValueError(f"Opção de gráficos desconhecida: '{config.plots}'")
+        self.solver = solver
+        self.plots = config.plots
+        self.results: List[Dict] = []
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.futures = []
+        if config.reporting == 'async':
+            self.pool = ProcessPoolExecutor(max_workers=1, initializer=_init_run_worker,
+                                            initargs=(solver.instance.filename, config, None))
+
+    def __enter__(self) -> 'RelatorioEVRP':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.finish()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(wait=True)
+
+    def _dispatch(self, method: str, *args):
+        if self.pool is None:
+            getattr(self.solver, method)(*args)
+        else:
+            self.futures.append(self.pool.submit(_report_worker, method, args))
+
+    def submit(self, run_result: Dict):
+        self.results.append(run_result)
+        self._dispatch('_report_run', run_result, self.plots == 'each')
+
+    def finish(self):
+        if self.plots == 'deferred':
+            for run_result in self.results:
+                self._dispatch('_plot_run', run_result)
+        elif self.plots == 'best' and self.results:
+            self._dispatch('_plot_run', min(self.results, key=lambda r: r['fitness']))
+        if self.results:
+            self._dispatch('_report_summary', self.results, self.plots != 'none')
+        for future in self.futures:
+            future.result()  # Propaga erros ocorridos no processo de relatórios
+
+# --- Execução paralela (um solver por processo do pool) ---
+_worker_solver: Optional[AlgoritmoGeneticoEVRP] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+
+def _init_run_worker(filename: str, config: ConfigEVRP, matrix_spec: Optional[Tuple]):
+    global _worker_solver, _worker_shm
+    dist_matrix = None
+    if matrix_spec is not None:
+        kind, location, shape, dtype = matrix_spec
+        if kind == 'memmap':
+            dist_matrix = np.memmap(location, dtype=np.dtype(dtype), mode='r', shape=shape)
+        else:
+            _worker_shm = shared_memory.SharedMemory(name=location)
+            dist_matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_worker_shm.buf)
+    _worker_solver = AlgoritmoGeneticoEVRP(filename, config, dist_matrix=dist_matrix)
+    _worker_solver.show_progress = False
+
+def _island_worker(state: Dict, generations: int, budget: int) -> Dict:
+    """Evolui uma ilha por até `generations` gerações; o estado (população e RNG) volta ao processo principal."""
+    solver = _worker_solver
+    if state['rng_state'] is None:
+        random.seed(state['seed'])
+    else:
+        random.setstate(state['rng_state'])
+
+    if state['genes'] is None:
+        population = solver._initialize_population()
+        solver.evaluation_count = len(population)
+    else:
+        population = [CromossomoEVRP(solver, genes, fitness=fitness) for genes, fitness in zip(state['genes'], state['fitness'])]
+        solver.evaluation_count = state['evaluations']
+
+    for _ in range(generations):
+        if solver.evaluation_count >= budget: break
+        population = solver._next_generation(population, budget)
+        population = solver._memetic_step(population, len(state['history']) + 1)
+        state['history'].append(min(ind.fitness for ind in population))
+        state['evaluation_history'].append(solver.evaluation_count)
+        state['elapsed'].append(time.time() - state['start_time'])
+
+    state['genes'] = [ind.genes for ind in population]
+    state['fitness'] = [ind.fitness for ind in population]
+    state['evaluations'] = solver.evaluation_count
+    state['rng_state'] = random.getstate()
+    return state
+
+def write_sub_instance(instance: InstanciaEVRP, customers: List[int], vehicles: int, path: str):
+    """Grava no formato .evrp a sub-instância com o depósito (nó 1), os `customers` renumerados a partir
+    de 2 e todas as estações. OPTIMAL_VALUE é só uma referência proporcional ao número de clientes."""
+    stations = sorted(instance.station_nodes)
+    reference = instance.optimal_value * len(customers) / instance.customers if instance.optimal_value > 0 else 1.0
+    nodes = [instance.depot] + list(customers) + stations
+    with open(path, 'w') as f:
+        f.write(f"Name: {os.path.basename(path)}\nTYPE: EVRP\nOPTIMAL_VALUE: {reference:.6f}\nVEHICLES: {vehicles}\n"
+                f"DIMENSION: {len(customers) + 1}\nSTATIONS: {len(stations)}\nCAPACITY: {instance.capacity}\n"
+                f"ENERGY_CAPACITY: {instance.energy_capacity}\nENERGY_CONSUMPTION: {instance.energy_consumption}\n"
+                "EDGE_WEIGHT_FORMAT: EUC_2D\nNODE_COORD_SECTION\n")
+        for new_id, node in enumerate(nodes, 1):
+            x, y = instance.coords[node]
+            f.write(f"{new_id} {x!r} {y!r}\n")
+        f.write("DEMAND_SECTION\n1 0\n")
+        for new_id, node in enumerate(customers, 2):
+            f.write(f"{new_id} {instance.demands.get(node, 0)}\n")
+        f.write("STATIONS_COORD_SECTION\n")
+        for new_id in range(len(customers) + 2, len(nodes) + 1):
+            f.write(f"{new_id}\n")
+        f.write("DEPOT_SECTION\n1\n-1\nEOF\n")
+
+def _cluster_worker(filename: str, config: ConfigEVRP, seed: int) -> Tuple[List[int], int]:
+    """Resolve uma sub-instância do modo de decomposição; devolve a rota sem as estações inseridas."""
+    solver = AlgoritmoGeneticoEVRP(filename, config)
+    solver.show_progress = False
+    result = solver._execute_run(1, solver._max_evaluations(), seed)
+    last_customer = solver.instance.customers + 1
+    return [node for node in result['route'] if node <= last_customer], solver.evaluation_count
+
+def _report_worker(method: str, args: Tuple):
+    """Executa no processo de relatórios um dos métodos de gravação/plotagem do solver."""
+    getattr(_worker_solver, method)(*args)
+
+def _run_worker(run_num: int, max_evaluations: int, seed: int) -> Optional[Dict]:
+    try:
+        return _worker_solver._execute_run(run_num, max_evaluations, seed)
+    except (RuntimeError, ValueError) as e:
+        print(f"Erro crítico na execução {run_num}: {e}")
+        return None
+
+# --- Carregamento em lote de instâncias ---
+def list_instance_files(paths: List[str]) -> List[str]:
+    """Expande diretórios nos arquivos `.evrp` que contêm (em ordem alfabética), sem repetir
+    arquivos citados mais de uma vez (mesmo caminho real), mantendo a primeira ocorrência."""
+    files, seen = [], set()
+    for path in paths:
+        for file in sorted(glob.glob(os.path.join(path, '*.evrp'))) if os.path.isdir(path) else [path]:
+            real = os.path.realpath(file)
+            if real not in seen:
+                seen.add(real)
+                files.append(file)
+    return files
+
+def _load_instance_worker(filename: str, distance_backend: str, cache_dir: str, warm_only: bool) -> Optional[InstanciaEVRP]:
+    instance = InstanciaEVRP(filename, distance_backend=distance_backend, cache_dir=cache_dir, use_cache=True)
+    return None if warm_only else instance  # Só aquecer o cache: não serializa a matriz de volta
+
+def carregar_instancias(paths: List[str], config: Optional[ConfigEVRP] = None, warm_only: bool = False) -> List[InstanciaEVRP]:
+    """Carrega (em paralelo, com `config.workers` processos) todas as instâncias de arquivos ou
+    diretórios, preenchendo o cache binário para que os solvers e workers seguintes iniciem rápido.
+    Com `warm_only`, apenas preenche o cache e retorna uma lista vazia."""
+    config = config if config else ConfigEVRP()
+    files = [f for f in list_instance_files(paths) if os.path.exists(f)]
+    if not files: return []
+    args = (files, [config.distance_backend] * len(files), [config.distance_cache_dir] * len(files), [warm_only] * len(files))
+    if config.workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(files))) as pool:
+            instances = list(pool.map(_load_instance_worker, *args))
+    else:
+        instances = list(map(_load_instance_worker, *args))
+    return [] if warm_only else instances
+
+# --- Função Principal ---
 def main():
-    config = ConfigEVRP(runs=20)
-    instance_files = ["E-n23-k3.evrp", "E-n51-k5.evrp"] 
+    workers = os.cpu_count() or 1
+    # Com vários workers as execuções já saem do processo principal, que fica livre para os relatórios;
+    # um processo de relatório a mais só disputaria CPU com o pool
+    config = ConfigEVRP(runs=20, workers=workers, instance_cache=True, reporting='async' if workers == 1 else 'sync',
+                        checkpoint_interval=50)
+    # Arquivos ou diretórios com instâncias podem ser passados na linha de comando
+    instance_files = list_instance_files(sys.argv[1:] or ["E-n23-k3.evrp", "E-n51-k5.evrp"])
+    carregar_instancias(instance_files, config, warm_only=True)
     
     for instance_file in instance_files:
         if not os.path.exists(instance_file):